@@ -0,0 +1,98 @@
+from ingestion import get_weather, fetch_news, fetch_news_batch, parse_news_risk, reverse_geocode
+from risk_engine import assess_stories_parallel, update_asset_registry
+from registry import asset_id
+from dedup import dedupe
+from database import save_analysis
+
+# --- DASHBOARD ANALYSIS RUN ---
+# The "Analyze All Assets" loop from app.py, kept free of Streamlit so it can
+# also be driven by benchmark.py.
+
+def analyze_assets(assets, risk_topic, on_progress=None):
+    """
+    Weather + local news + AI scoring (top 10 articles) for every located asset.
+    News is fetched once for all assets up front, so assets sharing a city share a query,
+    and every asset's articles are scored in one concurrent run.
+    on_progress(fraction, text) is called before each asset, then as AI requests finish.
+    Returns {asset_name: {'asset', 'weather', 'articles', 'max_risk'}}.
+    """
+    # This run's own asset set, however other sessions change the registry meanwhile
+    registry = update_asset_registry(assets)
+
+    located = [a for a in assets if a['lat'] is not None and a['lon'] is not None]
+    if not located:
+        return {}
+    total_steps = 2 * len(located)
+
+    # Pass 1: conditions and city for every asset
+    conditions = []
+    for idx, asset in enumerate(located):
+        if on_progress:
+            on_progress((idx + 1) / total_steps, f"Checking conditions at {asset['name']}...")
+        weather_clean = get_weather(asset['lat'], asset['lon'])
+        city = reverse_geocode(asset['lat'], asset['lon'])
+        conditions.append((asset, weather_clean, city))
+
+    news = fetch_news_batch([(risk_topic, city) for _, _, city in conditions])
+    broad_articles = None
+
+    # Pass 2: articles for every asset, then all of them scored concurrently
+    tops = []
+    for asset, weather_clean, city in conditions:
+        articles = dedupe(parse_news_risk(news[(risk_topic, city or None)]))
+
+        if not articles or len(articles) < 3:
+            if broad_articles is None:
+                broad_articles = dedupe(parse_news_risk(fetch_news(risk_topic, location=None)))
+            articles = list(broad_articles) if len(broad_articles) > len(articles) else articles
+
+        tops.append([art.copy() for art in articles[:10]])
+
+    def scoring_progress(done, total):
+        if on_progress:
+            on_progress((len(located) + len(located) * done / total) / total_steps,
+                        f"Analyzing articles ({done}/{total} AI requests)...")
+
+    if on_progress:
+        on_progress(len(located) / total_steps, f"Analyzing {len(located)} assets...")
+    requests = [(top, weather_clean, asset) for top, (asset, weather_clean, _) in zip(tops, conditions)]
+    scored = assess_stories_parallel(requests, on_progress=scoring_progress, registry=registry)
+
+    # An article that names another place is scored against the asset there
+    # (risk_engine's 'target_asset', a registry id). If that asset is in this run
+    # the article is listed with it and counts toward its risk instead of the risk
+    # of the asset whose news it came from; otherwise it counts where it was found
+    ids = {asset_id(asset) for asset, _, _ in conditions}
+    routed = {id_: [] for id_ in ids}
+    for (asset, _, _), top, assessments in zip(conditions, tops, scored):
+        for art, assessment in zip(top, assessments):
+            art.update(assessment)
+            if art.get('target_asset') in ids and art['target_asset'] != asset_id(asset):
+                routed[art['target_asset']].append(art)
+
+    results = {}
+    for (asset, weather_clean, city), top in zip(conditions, tops):
+        own = {art.get('story_id') or art['Headline'] for art in top}
+        enhanced_articles = top + [art.copy() for art in routed[asset_id(asset)]
+                                   if (art.get('story_id') or art['Headline']) not in own]
+
+        max_risk = max([a['risk_score'] for a in enhanced_articles
+                        if a.get('target_asset') not in ids or a['target_asset'] == asset_id(asset)], default=0)
+
+        results[asset['name']] = {
+            'asset': asset,
+            'weather': weather_clean,
+            'articles': enhanced_articles,
+            'max_risk': max_risk
+        }
+
+        if asset.get('id'):
+            save_analysis(
+                asset_id=asset['id'],
+                risk_topic=risk_topic,
+                weather_data=weather_clean,
+                articles=enhanced_articles,
+                max_risk_score=max_risk
+            )
+
+    return results
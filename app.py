@@ -1,14 +1,15 @@
 import streamlit as st
 import pandas as pd
-from ingestion import fetch_weather_coords, fetch_news, parse_weather_risk, parse_news_risk, reverse_geocode
-from risk_engine import assess_news_risk, update_asset_registry
+from ingestion import reverse_geocode
+from analysis import analyze_assets
+from records import Article, Weather
 import folium
 from streamlit_folium import st_folium
 from folium import plugins
 from database import (
     sign_in_user, sign_up_user, sign_out_user,
     save_asset, get_user_assets, delete_asset, 
-    save_analysis, bulk_save_assets, get_latest_analysis, get_threats_for_analysis
+    bulk_save_assets, get_latest_analysis, get_threats_for_analysis
 )
 
 st.set_page_config(page_title="AI Risk Agent", layout="wide", initial_sidebar_state="expanded")
@@ -340,22 +341,12 @@ else:
                         st.session_state.risk_topic = latest.get('risk_topic', st.session_state.risk_topic)
                         threats = get_threats_for_analysis(latest['id'])
                         
-                        articles = []
-                        for threat in threats:
-                            articles.append({
-                                'Headline': threat['headline'],
-                                'Source': threat['source'],
-                                'Published': threat['published_date'],
-                                'URL': threat['url'],
-                                'risk_score': threat['risk_score'],
-                                'severity': threat['severity'],
-                                'reasoning': threat['reasoning'],
-                                'action': threat['action'],
-                                'impacted_asset': threat['impacted_asset']
-                            })
+                        articles = [Article.from_threat(threat) for threat in threats]
                         
                         import json
                         weather = json.loads(latest['weather_data']) if latest['weather_data'] else {}
+                        if "temp_c" in weather:
+                            weather = Weather.from_dict(weather)
                         
                         results[asset['name']] = {
                             'asset': asset,
@@ -371,55 +362,11 @@ else:
         if not st.session_state.analysis_results:
             progress_bar = st.progress(0, text="Initializing multi-site analysis...")
             
-            update_asset_registry(st.session_state.assets)
-            
-            results = {}
-            total_steps = len(st.session_state.assets)
-            
-            for idx, asset in enumerate(st.session_state.assets):
-                if asset['lat'] is None or asset['lon'] is None:
-                    continue
-                
-                progress_bar.progress((idx + 1) / total_steps, text=f"Analyzing {asset['name']}...")
-                
-                weather_raw = fetch_weather_coords(asset['lat'], asset['lon'])
-                weather_clean = parse_weather_risk(weather_raw)
-                
-                city = reverse_geocode(asset['lat'], asset['lon'])
-                
-                news_raw = fetch_news(st.session_state.risk_topic, location=city)
-                articles = parse_news_risk(news_raw)
-                
-                if not articles or len(articles) < 3:
-                    news_raw_broad = fetch_news(st.session_state.risk_topic, location=None)
-                    articles_broad = parse_news_risk(news_raw_broad)
-                    articles = articles_broad if len(articles_broad) > len(articles) else articles
-                
-                enhanced_articles = []
-                if articles:
-                    for art in articles[:10]:
-                        ai_input = {"headline": art["Headline"], "summary": art.get("summary", art["Headline"])}
-                        assessment = assess_news_risk(ai_input, weather_data=weather_clean)
-                        art.update(assessment)
-                        enhanced_articles.append(art)
-                
-                max_risk = max([a['risk_score'] for a in enhanced_articles], default=0)
-                
-                results[asset['name']] = {
-                    'asset': asset,
-                    'weather': weather_clean,
-                    'articles': enhanced_articles,
-                    'max_risk': max_risk
-                }
-                
-                if asset.get('id'):
-                    save_analysis(
-                        asset_id=asset['id'],
-                        risk_topic=st.session_state.risk_topic,
-                        weather_data=weather_clean,
-                        articles=enhanced_articles,
-                        max_risk_score=max_risk
-                    )
+            results = analyze_assets(
+                st.session_state.assets,
+                st.session_state.risk_topic,
+                on_progress=lambda fraction, text: progress_bar.progress(fraction, text=text)
+            )
             
             progress_bar.empty()
             st.session_state.analysis_results = results
@@ -793,7 +740,7 @@ else:
             for asset_name, result in results.items():
                 weather = result['weather']
                 with st.expander(f"{asset_name} - Weather Data"):
-                    st.json(weather)
+                    st.json(dict(weather))
             
             st.divider()
             
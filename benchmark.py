@@ -0,0 +1,364 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+from fakes import FakeServices, FakeConfig
+
+# --- END-TO-END SCAN BENCHMARK ---
+# Runs monitor.run_sentinel_scan() and/or the dashboard's analyze_assets() loop
+# against local fakes of every provider (see fakes.py) and reports assets/sec,
+# p50/p95 latency per external call and peak Python memory.
+#
+#   python benchmark.py --assets 10,100,1000
+#   python benchmark.py --assets 100 --target app --latency 20 --latency openai=400 --error-rate 0.02
+#   python benchmark.py --assets 1000 --passes 2        # second pass = steady state
+#   python benchmark.py --assets 100 --rate-limits      # keep the real provider limits
+#   python benchmark.py --records                       # article/weather record memory + JSON decode speed
+#   python benchmark.py --spatial                       # get_impacted_assets, 100..100k assets
+#   python benchmark.py --gazetteer                     # event locations from article text
+#   python benchmark.py --assets 100 --record runs/base.db         # archive provider responses...
+#   python benchmark.py --assets 100 --replay runs/base.db --replay-latency recorded   # ...and replay them
+
+SERVICES = ("openweather", "newsapi", "nominatim", "openai", "supabase", "smtp")
+
+# Metric stage names (see metrics.py) in pipeline order
+REPORT_STAGES = (
+    "fetch_weather_coords", "reverse_geocode", "fetch_news", "openai_assess_news_risk", "openai_assess_news_risk_batch",
+    "openai_assess_news_risk_multi",
+    "db_insert_analyses", "db_insert_threats", "db_insert_alerts", "send_email_alert",
+    # Queue waits in front of each provider (ratelimit.py), only with --rate-limits
+    "ratelimit_openweather", "ratelimit_nominatim", "ratelimit_newsapi", "ratelimit_openai",
+)
+RATE_LIMITED = ("openweather", "newsapi", "nominatim", "openai")
+# PersistentCache namespaces whose hit rates are reported
+REPORT_CACHES = ("weather", "geocode", "llm_assessments", "story_scores")
+
+# Synthetic assets cluster around these hubs, so some share cities and weather cells
+HUBS = [
+    (19.0760, 72.8777), (28.7041, 77.1025), (12.9716, 77.5946), (13.0827, 80.2707),
+    (22.5726, 88.3639), (17.3850, 78.4867), (23.0225, 72.5714), (18.5204, 73.8567),
+]
+ASSET_TYPES = ["Warehouse", "Factory", "Distribution", "Port Access", "Office"]
+
+def synthetic_assets(count, seed=7):
+    rng = random.Random(seed)
+    assets = []
+    for i in range(count):
+        hub_lat, hub_lon = rng.choice(HUBS)
+        assets.append({
+            "user_id": "bench-user",
+            "name": f"Bench Asset {i:05d}",
+            "type": rng.choice(ASSET_TYPES),
+            "lat": round(hub_lat + rng.uniform(-0.3, 0.3), 5),
+            "lon": round(hub_lon + rng.uniform(-0.3, 0.3), 5),
+            "importance": rng.randint(1, 10),
+            "radius": rng.choice([5, 10, 20, 50]),
+            "created_at": f"2026-01-01T00:00:{i % 60:02d}.{i:06d}",
+        })
+    return assets
+
+def parse_latencies(values, default_ms):
+    """['20', 'openai=400'] -> {service: ms}. A bare number sets every service."""
+    latencies = {name: default_ms for name in SERVICES}
+    for value in values or []:
+        if "=" in value:
+            name, ms = value.split("=", 1)
+            latencies[name.strip()] = float(ms)
+        else:
+            latencies = {name: float(value) for name in SERVICES}
+    return latencies
+
+class Benchmark:
+    def __init__(self, fakes, quiet=True):
+        self.fakes = fakes
+        self.quiet = quiet
+
+        # Sentinel modules read their config at import time, so import after the env is set
+        import cache
+        import metrics
+        import monitor
+        import analysis
+        self.cache = cache
+        self.metrics = metrics
+        self.monitor = monitor
+        self.analysis = analysis
+        monitor.ALERT_RECIPIENT = "alerts@bench.local"
+
+    def seed(self, count):
+        self.fakes.tables.clear()
+        self.fakes.sent_emails.clear()
+        rows = synthetic_assets(count)
+        for idx, row in enumerate(rows):
+            row["id"] = f"bench-{idx:05d}"
+        self.fakes.tables["assets"] = [dict(row) for row in rows]
+        return rows
+
+    def _timed(self, func):
+        tracemalloc.start()
+        started = time.perf_counter()
+        if self.quiet:
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                result = func()
+        else:
+            result = func()
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, wall, peak
+
+    def run(self, target, count, passes=1):
+        """Returns one report row per pass."""
+        assets = self.seed(count)
+        self.cache.clear_all()
+        rows = []
+        for n in range(passes):
+            self.metrics.reset()
+            self.fakes.sent_emails.clear()
+            if target == "monitor":
+                _, wall, peak = self._timed(lambda: self.monitor.run_sentinel_scan(budget_minutes=0))
+            else:
+                app_assets = [dict(asset) for asset in assets]
+                _, wall, peak = self._timed(lambda: self.analysis.analyze_assets(app_assets, "logistics"))
+            rows.append(self._report_row(target, count, n + 1, wall, peak))
+        return rows
+
+    def _report_row(self, target, count, pass_no, wall, peak):
+        row = {
+            "target": target,
+            "assets": count,
+            "pass": pass_no,
+            "wall_s": wall,
+            "assets_per_s": count / wall if wall else 0,
+            "peak_mb": peak / 1024 / 1024,
+            "emails": len(self.fakes.sent_emails),
+            "stages": {},
+            "caches": {},
+            "prefilter": (self.metrics.counter("sentinel_relevance_total", result="skipped"),
+                          self.metrics.counter("sentinel_relevance_total")),
+        }
+        for name in REPORT_CACHES:
+            hits = self.metrics.counter("sentinel_cache_requests_total", cache=name, result="hit")
+            misses = self.metrics.counter("sentinel_cache_requests_total", cache=name, result="miss")
+            if hits or misses:
+                row["caches"][name] = (hits, misses)
+        for stage in REPORT_STAGES:
+            calls = self.metrics.call_count(stage)
+            if not calls:
+                continue
+            row["stages"][stage] = {
+                "calls": calls,
+                "errors": self.metrics.call_count(stage, "error"),
+                "p50_ms": self.metrics.quantile(stage, 0.50) * 1000,
+                "p95_ms": self.metrics.quantile(stage, 0.95) * 1000,
+            }
+        return row
+
+def _news_payload(count):
+    articles = [{
+        "source": {"id": None, "name": "Reuters"},
+        "title": f"Fire reported at industrial park in City {i % 50} (update {i})",
+        "description": f"Officials are monitoring the situation at site {i}. Roads nearby are closed.",
+        "url": f"https://news.example/story/{i:06d}",
+        "publishedAt": f"2026-01-{1 + i % 28:02d}T{i % 24:02d}:00:00Z",
+    } for i in range(count)]
+    return {"status": "ok", "totalResults": count, "articles": articles}
+
+def _traced_size(build):
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+def record_report(count=10000):
+    """Memory of count parsed + scored articles as plain dicts vs records, and JSON decode speed."""
+    import json
+    import ingestion
+    payload = _news_payload(count)
+    assessment = {"risk_score": 40, "severity": "MEDIUM", "reasoning": "r", "action": "a",
+                  "estimated_impact_radius": 5, "impacted_asset": "Bench Asset"}
+
+    def as_dicts():
+        parsed = [dict(art.items()) for art in ingestion.parse_news_risk(payload)]
+        for art in parsed:
+            art["story_id"] = "0123456789abcdef"
+            art.update(assessment)
+        return parsed
+
+    def as_records():
+        parsed = ingestion.parse_news_risk(payload)
+        for art in parsed:
+            art["story_id"] = "0123456789abcdef"
+            art.update(assessment)
+        return parsed
+
+    # Strings are shared by both variants, so this is the container overhead
+    dicts, records = _traced_size(as_dicts), _traced_size(as_records)
+    print(f"\n📦 {count} scored articles: dicts {dicts / 1024 / 1024:.2f} MB, "
+          f"records {records / 1024 / 1024:.2f} MB ({1 - records / dicts:.0%} less)")
+
+    body = json.dumps(_news_payload(100)).encode("utf-8")
+    for name, loads in (("json", json.loads), ("fast path", ingestion._json_loads)):
+        started = time.perf_counter()
+        for _ in range(200):
+            loads(body)
+        print(f"   {name:<10} decode of a 100-article NewsAPI page: {(time.perf_counter() - started) / 200 * 1000:.2f} ms")
+
+def spatial_report(counts=(100, 1000, 10000, 100000), queries=200):
+    """get_impacted_assets() on an indexed registry snapshot vs the old per-asset loop, assets spread over India."""
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ.setdefault("SENTINEL_CACHE_DB", os.path.join(tempfile.mkdtemp(prefix="sentinel-bench-"), "cache.db"))
+    import risk_engine
+    from registry import RegistrySnapshot
+
+    rng = random.Random(7)
+    print(f"\n🗺️  get_impacted_assets, mean of {queries} events (radius 5-20 km, 1% at 100 km)")
+    for count in counts:
+        registry = [{"id": f"A{i}", "name": f"Asset {i}", "type": "Warehouse",
+                     "lat": rng.uniform(8, 35), "lon": rng.uniform(68, 97), "importance": rng.randint(1, 10),
+                     "radius": 100 if rng.random() < 0.01 else rng.choice([5, 10, 15, 20])} for i in range(count)]
+        events = [(rng.uniform(8, 35), rng.uniform(68, 97)) for _ in range(queries)]
+
+        started = time.perf_counter()
+        loop = [[a["id"] for a in registry
+                 if risk_engine.calculate_distance(lat, lon, a["lat"], a["lon"]) <= a["radius"]] for lat, lon in events]
+        loop_ms = (time.perf_counter() - started) / queries * 1000
+
+        started = time.perf_counter()
+        snapshot = RegistrySnapshot.from_assets(registry)
+        build_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        for lat, lon in events:
+            snapshot.index.within(lat, lon)
+        within_ms = (time.perf_counter() - started) / queries * 1000
+        started = time.perf_counter()
+        indexed = [risk_engine.get_impacted_assets(lat, lon, snapshot) for lat, lon in events]
+        indexed_ms = (time.perf_counter() - started) / queries * 1000
+
+        same = all(sorted(ids) == sorted(a["id"] for a in found) for ids, found in zip(loop, indexed))
+        hits = sum(map(len, loop)) / queries
+        print(f"   {count:>7} assets | loop {loop_ms:9.3f} ms | index {indexed_ms:7.3f} ms "
+              f"(radius query {within_ms:.3f} ms, build {build_ms:6.1f} ms) | "
+              f"{hits:5.1f} impacted/event | {'same' if same else 'DIFFERENT'} results")
+
+def gazetteer_report(articles=5000):
+    """Gazetteer build/open time and locate() speed and accuracy on fake headlines naming bundled places."""
+    import gazetteer
+    from fakes import HEADLINE_TEMPLATES
+
+    index_path = os.path.join(tempfile.mkdtemp(prefix="sentinel-bench-"), "gazetteer.idx")
+    started = time.perf_counter()
+    gazetteer.build_index(gazetteer.GAZETTEER_SOURCE, index_path)
+    build_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    index = gazetteer.Gazetteer(index_path)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(7)
+    names = [name for name, *_ in gazetteer._read_source(gazetteer.GAZETTEER_SOURCE)]
+    cases = []
+    for _ in range(articles):
+        # Half name a place; the rest only say "the region", as NewsAPI results often do
+        name = rng.choice(names) if rng.random() < 0.5 else None
+        headline = rng.choice(HEADLINE_TEMPLATES).format(place=name or "the region")
+        cases.append((name, headline, f"{headline}. Officials are monitoring the situation, local reports said on Tuesday."))
+    started = time.perf_counter()
+    found = [index.locate(headline, summary, near=HUBS[0]) for _, headline, summary in cases]
+    locate_us = (time.perf_counter() - started) / articles * 1e6
+
+    right = sum(1 for (name, _, _), place in zip(cases, found) if name and place and place.name == name)
+    named = sum(1 for name, _, _ in cases if name)
+    stray = sum(1 for (name, _, _), place in zip(cases, found) if not name and place)
+    print(f"\n📍 gazetteer: {len(index)} places, {index.header['names']} names, {os.path.getsize(index_path) / 1024:.0f} KB index "
+          f"(build {build_ms:.1f} ms, open {open_ms:.2f} ms)")
+    print(f"   locate() {locate_us:.1f} µs/article | {right}/{named} named places found | "
+          f"{stray}/{articles - named} located without a place name")
+
+def print_row(row):
+    print(f"\n📈 {row['target']} | {row['assets']} assets | pass {row['pass']}: "
+          f"{row['wall_s']:.2f}s wall, {row['assets_per_s']:.1f} assets/s, "
+          f"peak {row['peak_mb']:.1f} MB, {row['emails']} emails")
+    for stage, s in row["stages"].items():
+        print(f"   {stage:<26} calls {s['calls']:>6} | err {s['errors']:>4} | "
+              f"p50 {s['p50_ms']:8.1f} ms | p95 {s['p95_ms']:8.1f} ms")
+    if row["caches"]:
+        print("   cache hits: " + ", ".join(f"{name} {hits}/{hits + misses}"
+                                           for name, (hits, misses) in row["caches"].items()))
+    skipped, screened = row["prefilter"]
+    if screened:
+        print(f"   pre-filter: {skipped}/{screened} articles ({skipped / screened:.0%}) skipped the LLM")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Sentinel scans against local fake providers.")
+    parser.add_argument("--assets", default="10,100,1000", help="Comma-separated asset counts (10..10000)")
+    parser.add_argument("--target", choices=["monitor", "app", "both"], default="monitor")
+    parser.add_argument("--latency", action="append",
+                        help="Fake latency in ms: '20' for all, or 'openai=400' per service (repeatable)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake requests that fail (0..1)")
+    parser.add_argument("--articles", type=int, default=20, help="Articles returned per NewsAPI query")
+    parser.add_argument("--passes", type=int, default=1, help="Scans per size (later passes see warm state)")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Apply the real provider rate limits (default: unlimited, to measure Sentinel itself)")
+    parser.add_argument("--record", metavar="ARCHIVE", help="Record provider responses to this archive (replay.py)")
+    parser.add_argument("--replay", metavar="ARCHIVE", help="Serve provider calls from this archive instead of the fakes")
+    parser.add_argument("--replay-latency", default="0",
+                        help="Replay latency: 'recorded', or fixed ms per call (default 0)")
+    parser.add_argument("--records", action="store_true",
+                        help="Only measure article record memory (per 10k) and JSON decode speed")
+    parser.add_argument("--spatial", action="store_true",
+                        help="Only time get_impacted_assets() for 100..100k assets (index vs per-asset loop)")
+    parser.add_argument("--gazetteer", action="store_true",
+                        help="Only time event location from article text (gazetteer.py)")
+    parser.add_argument("--verbose", action="store_true", help="Show the scan's own console output")
+    args = parser.parse_args(argv)
+
+    if args.records:
+        record_report()
+        return
+    if args.spatial:
+        spatial_report()
+        return
+    if args.gazetteer:
+        gazetteer_report()
+        return
+
+    latencies = parse_latencies(args.latency, default_ms=5)
+    configs = {name: FakeConfig(latencies[name], args.error_rate, args.articles) for name in SERVICES}
+    fakes = FakeServices(configs).start()
+
+    # Point Sentinel at the fakes and at a throwaway cache before importing it
+    os.environ.update(fakes.environment())
+    os.environ["SENTINEL_CACHE_DB"] = os.path.join(tempfile.mkdtemp(prefix="sentinel-bench-"), "cache.db")
+    os.environ.setdefault("PIPELINE_REPORT_SECONDS", "3600")
+    if args.record or args.replay:
+        os.environ["SENTINEL_REPLAY_MODE"] = "record" if args.record else "replay"
+        os.environ["SENTINEL_REPLAY_ARCHIVE"] = args.record or args.replay
+        os.environ["SENTINEL_REPLAY_LATENCY"] = args.replay_latency
+    if not args.rate_limits:
+        for provider in RATE_LIMITED:
+            os.environ.setdefault(f"RATELIMIT_{provider.upper()}", "0")
+
+    print(f"🧪 Fakes up. Latency (ms): {latencies} | error rate {args.error_rate:.1%}")
+    bench = Benchmark(fakes, quiet=not args.verbose)
+    targets = ["monitor", "app"] if args.target == "both" else [args.target]
+
+    try:
+        for count in [int(n) for n in args.assets.split(",")]:
+            for target in targets:
+                for row in bench.run(target, count, args.passes):
+                    print_row(row)
+        if args.record:
+            import replay
+            for provider, (count, size) in sorted(replay.stats().items()):
+                print(f"   📼 {provider:<12} {count:>6} responses, {size / 1024:8.1f} KB compressed")
+    finally:
+        fakes.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
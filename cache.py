@@ -0,0 +1,111 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from metrics import inc
+
+# --- PERSISTENT CACHE ---
+# Small key/value store on a local SQLite file, shared by monitor.py and app.py
+# (and by several processes). Values are JSON. Each namespace has its own TTL
+# and an optional size cap; when the cap is exceeded the least recently used
+# entries are evicted.
+
+CACHE_DB_PATH = os.getenv("SENTINEL_CACHE_DB", "sentinel_cache.db")
+
+_connections = {}
+_connections_lock = threading.Lock()
+_db_lock = threading.RLock()  # Serialises statements on the shared connections
+_instances = []
+
+def _connection(db_path):
+    """One shared connection per database file."""
+    with _connections_lock:
+        conn = _connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, key))""")
+            _connections[db_path] = conn
+        return conn
+
+class PersistentCache:
+    def __init__(self, namespace, ttl=None, max_entries=None, db_path=CACHE_DB_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_evict = 0
+        _instances.append(self)
+
+    @property
+    def _conn(self):
+        return _connection(self.db_path)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with _db_lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                inc("sentinel_cache_requests_total", cache=self.namespace, result="miss")
+                return default
+            self.hits += 1
+            inc("sentinel_cache_requests_total", cache=self.namespace, result="hit")
+            self._conn.execute("UPDATE cache SET last_used = ? WHERE namespace = ? AND key = ?",
+                               (now, self.namespace, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = now + ttl if ttl else None
+        with _db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at, now))
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 100:
+                self._evict(now)
+
+    def delete(self, key):
+        with _db_lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self):
+        with _db_lock:
+            self._conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def _evict(self, now):
+        """Drops expired rows, then the least recently used ones above max_entries."""
+        self._writes_since_evict = 0
+        self._conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+        if self.max_entries:
+            self._conn.execute("""DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                (self.namespace, self.namespace, self.max_entries))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0,
+        }
+
+def clear_all():
+    """Empties every cache created in this process (used by benchmark.py for cold runs)."""
+    for cache in _instances:
+        cache.clear()
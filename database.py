@@ -3,6 +3,7 @@ from supabase import create_client, Client
 from datetime import datetime
 from dotenv import load_dotenv
 import json
+from metrics import track
 
 load_dotenv()
 
@@ -87,7 +88,8 @@ def save_asset(asset_data, user_id):
             return result.data[0]
         else:
             payload['created_at'] = datetime.utcnow().isoformat()
-            result = supabase.table('assets').insert(payload).execute()
+            with track("db_insert_assets"):
+                result = supabase.table('assets').insert(payload).execute()
             return result.data[0]
     except Exception as e:
         print(f"Error saving asset: {e}")
@@ -145,13 +147,14 @@ def bulk_save_assets(assets_list, user_id):
 def save_analysis(asset_id, risk_topic, weather_data, articles, max_risk_score):
     """Save an analysis run."""
     try:
-        result = supabase.table('analyses').insert({
-            'asset_id': asset_id,
-            'risk_topic': risk_topic,
-            'weather_data': json.dumps(weather_data),
-            'max_risk_score': max_risk_score,
-            'analyzed_at': datetime.utcnow().isoformat()
-        }).execute()
+        with track("db_insert_analyses"):
+            result = supabase.table('analyses').insert({
+                'asset_id': asset_id,
+                'risk_topic': risk_topic,
+                'weather_data': json.dumps(dict(weather_data)),
+                'max_risk_score': max_risk_score,
+                'analyzed_at': datetime.utcnow().isoformat()
+            }).execute()
         
         analysis_id = result.data[0]['id']
         for article in articles:
@@ -183,18 +186,19 @@ def get_latest_analysis(asset_id, limit=1):
 def save_threat(analysis_id, threat_data):
     """Save a threat associated with an analysis."""
     try:
-        supabase.table('threats').insert({
-            'analysis_id': analysis_id,
-            'headline': threat_data.get('Headline'),
-            'source': threat_data.get('Source'),
-            'published_date': threat_data.get('Published'),
-            'url': threat_data.get('URL'),
-            'risk_score': threat_data.get('risk_score', 0),
-            'severity': threat_data.get('severity'),
-            'reasoning': threat_data.get('reasoning'),
-            'action': threat_data.get('action'),
-            'impacted_asset': threat_data.get('impacted_asset')
-        }).execute()
+        with track("db_insert_threats"):
+            supabase.table('threats').insert({
+                'analysis_id': analysis_id,
+                'headline': threat_data.get('Headline'),
+                'source': threat_data.get('Source'),
+                'published_date': threat_data.get('Published'),
+                'url': threat_data.get('URL'),
+                'risk_score': threat_data.get('risk_score', 0),
+                'severity': threat_data.get('severity'),
+                'reasoning': threat_data.get('reasoning'),
+                'action': threat_data.get('action'),
+                'impacted_asset': threat_data.get('impacted_asset')
+            }).execute()
     except Exception as e:
         print(f"Error saving threat: {e}")
 
@@ -212,13 +216,14 @@ def get_threats_for_analysis(analysis_id):
 def save_alert(threat_id, alert_type, recipient, status='sent'):
     """Log an alert that was sent."""
     try:
-        result = supabase.table('alerts').insert({
-            'threat_id': threat_id,
-            'alert_type': alert_type,
-            'recipient': recipient,
-            'status': status,
-            'sent_at': datetime.utcnow().isoformat()
-        }).execute()
+        with track("db_insert_alerts"):
+            result = supabase.table('alerts').insert({
+                'threat_id': threat_id,
+                'alert_type': alert_type,
+                'recipient': recipient,
+                'status': status,
+                'sent_at': datetime.utcnow().isoformat()
+            }).execute()
         
         return result.data[0]
     except Exception as e:
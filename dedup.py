@@ -0,0 +1,97 @@
+import os
+import re
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from cache import PersistentCache
+from metrics import inc
+
+# --- STORY DEDUPLICATION ---
+# The same wire story shows up from several outlets and under several city
+# queries. Every parsed article gets a story_id: articles with the same URL, or
+# whose headline + summary SimHash is within DEDUP_MAX_DISTANCE bits, share one.
+# Story ids are remembered for DEDUP_WINDOW_HOURS in the shared cache, so a
+# rewrite of yesterday's story maps to yesterday's id on the next scan.
+#
+# Near-duplicate lookup uses the pigeonhole trick: with 4 bands of 16 bits, two
+# hashes at most 3 bits apart agree exactly on at least one band.
+
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "3"))
+DEDUP_WINDOW_HOURS = float(os.getenv("DEDUP_WINDOW_HOURS", "48"))
+BANDS = 4
+BAND_BITS = 64 // BANDS
+MAX_BUCKET = 20  # Hashes kept per band value
+
+STORIES = PersistentCache("stories", ttl=int(DEDUP_WINDOW_HOURS * 3600), max_entries=200000)
+_lock = threading.Lock()
+
+_STOPWORDS = frozenset("a an and are as at be by for from has have in is it its of on or that the to was were will with".split())
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ref", "cmpid")
+
+def normalize_url(url):
+    """Lower-cased host, no fragment, trailing slash or tracking parameters."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith(_TRACKING_PARAMS)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), urlencode(query), ""))
+
+def _tokens(text):
+    return [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if w not in _STOPWORDS]
+
+def simhash(text):
+    """64-bit SimHash over word bigrams (single words for very short texts)."""
+    words = _tokens(text)
+    shingles = [" ".join(words[i:i + 2]) for i in range(len(words) - 1)] or words
+    if not shingles:
+        return 0
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def _bands(h):
+    mask = (1 << BAND_BITS) - 1
+    return [f"band:{i}:{h >> (i * BAND_BITS) & mask:04x}" for i in range(BANDS)]
+
+def story_id(article):
+    """Assigns (and remembers) the article's story id."""
+    url = normalize_url(article.get("URL"))
+    h = simhash(f"{article.get('Headline') or ''} {article.get('summary') or ''}")
+
+    with _lock:
+        if url:
+            known = STORIES.get(f"url:{url}")
+            if known:
+                inc("sentinel_dedup_total", result="url")
+                return known
+
+        for band in _bands(h):
+            for other, other_id in STORIES.get(band, []):
+                if bin(h ^ other).count("1") <= DEDUP_MAX_DISTANCE:
+                    inc("sentinel_dedup_total", result="near")
+                    if url:
+                        STORIES.set(f"url:{url}", other_id)
+                    return other_id
+
+        new_id = f"{h:016x}"
+        inc("sentinel_dedup_total", result="new")
+        if url:
+            STORIES.set(f"url:{url}", new_id)
+        for band in _bands(h):
+            STORIES.set(band, (STORIES.get(band, []) + [[h, new_id]])[-MAX_BUCKET:])
+        return new_id
+
+def dedupe(articles):
+    """Tags every article with its story_id and keeps the first copy of each story (order kept)."""
+    unique = []
+    seen = set()
+    for art in articles:
+        art["story_id"] = story_id(art)
+        if art["story_id"] not in seen:
+            seen.add(art["story_id"])
+            unique.append(art)
+    return unique
@@ -0,0 +1,403 @@
+import json
+import time
+import random
+import socket
+import hashlib
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# --- LOCAL FAKE PROVIDERS ---
+# Minimal stand-ins for every external service Sentinel talks to, so scans can
+# be benchmarked without API keys or spend. Each fake listens on 127.0.0.1,
+# adds configurable latency, and fails a configurable share of requests
+# (HTTP 500/429, or SMTP 451).
+#
+#   openweather  GET  /data/2.5/weather            (ingestion.fetch_weather_coords)
+#   newsapi      GET  /v2/everything               (ingestion.fetch_news)
+#   nominatim    GET  /reverse                     (ingestion.reverse_geocode via geopy)
+#   openai       POST /v1/chat/completions         (risk_engine via instructor, tool calls)
+#   supabase     GET/POST/PATCH/DELETE /rest/v1/*  (database.py via postgrest)
+#   smtp         EHLO/AUTH/MAIL/RCPT/DATA          (notifications.send_email_alert)
+
+class FakeConfig:
+    def __init__(self, latency_ms=0.0, error_rate=0.0, articles_per_query=20):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.articles_per_query = articles_per_query
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency_ms:
+            # +/- 50% around the configured latency
+            time.sleep(self.latency_ms / 1000 * random.uniform(0.5, 1.5))
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            failed = random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+def _seed(*parts):
+    """Deterministic int from any inputs, so the same query gets the same fake data."""
+    return int(hashlib.md5("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:8], 16)
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real providers
+    config = None
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as two writes; without this Nagle adds ~40ms to each response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _handle(self, method):
+        body = self._read_body() if method in ("POST", "PATCH") else None
+        self.config.delay()
+        if self.config.should_fail():
+            status = random.choice((429, 500))
+            self._send_json({"error": "injected failure"}, status,
+                            {"Retry-After": "0"} if status == 429 else None)
+            return
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        status, payload = self.respond(method, url.path, params, body)
+        self._send_json(payload, status)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def respond(self, method, path, params, body):
+        raise NotImplementedError
+
+# --- WEATHER / NEWS / GEOCODING ---
+
+CONDITIONS = ["clear sky", "few clouds", "light rain", "moderate rain", "thunderstorm", "haze", "mist"]
+
+class OpenWeatherHandler(_JSONHandler):
+    def respond(self, method, path, params, body):
+        lat, lon = float(params.get("lat", 0)), float(params.get("lon", 0))
+        # Weather is regional (~50km cells) with small local temperature differences
+        rng = random.Random(_seed(round(lat * 2) / 2, round(lon * 2) / 2))
+        local = random.Random(_seed(round(lat, 2), round(lon, 2)))
+        return 200, {
+            "coord": {"lat": lat, "lon": lon},
+            "name": f"Cell {round(lat, 1)},{round(lon, 1)}",
+            "main": {"temp": round(rng.uniform(15, 40) + local.uniform(-1, 1), 1)},
+            "weather": [{"description": rng.choice(CONDITIONS)}],
+            "wind": {"speed": round(rng.uniform(0, 20), 1)},
+            "visibility": rng.choice([10000, 8000, 3000, 800]),
+        }
+
+HEADLINE_TEMPLATES = [
+    "Port congestion delays shipments near {place}",
+    "Fire reported at industrial park in {place}",
+    "Truckers strike disrupts freight in {place}",
+    "Flooding closes highways around {place}",
+    "Quarterly earnings beat estimates for logistics firm in {place}",
+    "New warehouse opens in {place}",
+]
+
+class NewsAPIHandler(_JSONHandler):
+    def respond(self, method, path, params, body):
+        query = params.get("q", "")
+        place = query.split(" AND ", 1)[-1] if " AND " in query else "the region"
+        # 'topic AND (A OR "B C")': articles rotate through the OR'd places
+        places = [p.strip().strip('"') for p in place.strip("()").split(" OR ")]
+        # An article's identity depends only on its place, however the places are grouped
+        articles = []
+        for i in range(self.config.articles_per_query):
+            place, n = places[i % len(places)], i // len(places)
+            rng = random.Random(_seed(place, n))
+            headline = rng.choice(HEADLINE_TEMPLATES).format(place=place)
+            articles.append({
+                "source": {"name": rng.choice(["Reuters", "PTI", "Local Wire"])},
+                "title": headline,
+                "description": f"{headline}. Officials are monitoring the situation.",
+                "url": f"https://news.example/{_seed(place, n)}",
+                "publishedAt": f"2026-01-{28 - n % 28:02d}T{23 - n % 24:02d}:00:00Z",
+            })
+        if params.get("from"):
+            articles = [a for a in articles if a["publishedAt"][:19] >= params["from"][:19]]
+        return 200, {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+class NominatimHandler(_JSONHandler):
+    def respond(self, method, path, params, body):
+        lat, lon = float(params.get("lat", 0)), float(params.get("lon", 0))
+        # ~50km cells share a city name, so co-located assets look co-located
+        city = f"City {round(lat * 2) / 2:g}_{round(lon * 2) / 2:g}"
+        return 200, {
+            "lat": str(lat),
+            "lon": str(lon),
+            "display_name": f"{city}, Fakeland",
+            "address": {"city": city, "country": "Fakeland"},
+        }
+
+# --- OPENAI (instructor tool calls) ---
+
+def _fake_instance(schema, defs, rng):
+    """Builds a value that validates against a JSON schema (the subset pydantic emits)."""
+    if "$ref" in schema:
+        return _fake_instance(defs[schema["$ref"].split("/")[-1]], defs, rng)
+    if "anyOf" in schema:
+        return _fake_instance(schema["anyOf"][0], defs, rng)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type", "object")
+    if kind == "object":
+        return {name: _fake_instance(prop, defs, rng) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        count = schema.get("minItems", 1)
+        return [_fake_instance(schema.get("items", {}), defs, rng) for _ in range(count)]
+    if kind == "integer":
+        return rng.randint(schema.get("minimum", 0), schema.get("maximum", 100))
+    if kind == "number":
+        return round(rng.uniform(0, 100), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    description = schema.get("description", "")
+    if "LOW, MEDIUM, HIGH, CRITICAL" in description:
+        return rng.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"])
+    return "Synthetic assessment from the local OpenAI fake."
+
+class OpenAIHandler(_JSONHandler):
+    def respond(self, method, path, params, body):
+        prompt = json.dumps(body.get("messages", []))
+        rng = random.Random(_seed(prompt))
+        tools = body.get("tools") or []
+        choice = body.get("tool_choice")
+        if isinstance(choice, dict):
+            wanted = choice.get("function", {}).get("name")
+            tools = [t for t in tools if t["function"]["name"] == wanted] or tools
+
+        message = {"role": "assistant", "content": None}
+        if tools:
+            function = tools[0]["function"]
+            schema = function.get("parameters", {})
+            arguments = _fake_instance(schema, schema.get("$defs", {}), rng)
+            message["tool_calls"] = [{
+                "id": f"call_{rng.getrandbits(32):08x}",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+            }]
+            finish_reason = "tool_calls"
+        else:
+            message["content"] = "{}"
+            finish_reason = "stop"
+
+        prompt_tokens = len(prompt) // 4
+        return 200, {
+            "id": f"chatcmpl-{rng.getrandbits(48):012x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60,
+                      "total_tokens": prompt_tokens + 60},
+        }
+
+# --- SUPABASE (PostgREST subset) ---
+
+class SupabaseHandler(_JSONHandler):
+    tables = None      # table name -> list of rows
+    lock = None
+    next_id = None     # [int], shared counter
+
+    def _matches(self, row, params):
+        for column, condition in params.items():
+            if column in ("select", "order", "limit", "offset", "columns"):
+                continue
+            op, _, value = condition.partition(".")
+            current = row.get(column)
+            if op == "eq" and str(current) != value:
+                return False
+            if op == "gte" and (current is None or str(current) < value):
+                return False
+            if op == "lte" and (current is None or str(current) > value):
+                return False
+        return True
+
+    def respond(self, method, path, params, body):
+        table = path.rsplit("/", 1)[-1]
+        with self.lock:
+            rows = self.tables.setdefault(table, [])
+            if method == "GET":
+                result = [row for row in rows if self._matches(row, params)]
+                for part in reversed([p for p in params.get("order", "").split(",") if p]):
+                    column, _, direction = part.partition(".")
+                    result.sort(key=lambda r: (r.get(column) is None, str(r.get(column))),
+                                reverse=direction.startswith("desc"))
+                if "limit" in params:
+                    result = result[:int(params["limit"])]
+                return 200, result
+            if method == "POST":
+                new_rows = body if isinstance(body, list) else [body]
+                for row in new_rows:
+                    self.next_id[0] += 1
+                    row.setdefault("id", self.next_id[0])
+                    rows.append(row)
+                return 201, new_rows
+            if method == "PATCH":
+                updated = []
+                for row in rows:
+                    if self._matches(row, params):
+                        row.update(body)
+                        updated.append(row)
+                return 200, updated
+            if method == "DELETE":
+                self.tables[table] = [row for row in rows if not self._matches(row, params)]
+                return 200, []
+        return 405, {"error": "method not supported"}
+
+# --- SMTP ---
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    config = None
+    sent = None   # list of (sender, recipients, size)
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode("utf-8"))
+
+    def handle(self):
+        self._reply("220 fake-smtp ESMTP ready")
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-fake-smtp")
+                self._reply("250-AUTH PLAIN LOGIN")
+                self._reply("250 OK")
+            elif verb == "HELO":
+                self._reply("250 fake-smtp")
+            elif verb == "AUTH":
+                self._reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<> "), []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip("<> "))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    size += len(line)
+                self.config.delay()
+                if self.config.should_fail():
+                    self._reply("451 Injected failure")
+                else:
+                    self.sent.append((sender, recipients, size))
+                    self._reply("250 Message accepted")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+# --- STARTUP ---
+
+class FakeServices:
+    """Starts every fake on a free local port. configs: {service: FakeConfig}."""
+
+    HTTP_HANDLERS = {
+        "openweather": OpenWeatherHandler,
+        "newsapi": NewsAPIHandler,
+        "nominatim": NominatimHandler,
+        "openai": OpenAIHandler,
+        "supabase": SupabaseHandler,
+    }
+
+    def __init__(self, configs=None):
+        configs = configs or {}
+        self.configs = {name: configs.get(name, FakeConfig()) for name in list(self.HTTP_HANDLERS) + ["smtp"]}
+        self.tables = {}
+        self.sent_emails = []
+        self.servers = {}
+
+    def start(self):
+        for name, base in self.HTTP_HANDLERS.items():
+            attrs = {"config": self.configs[name]}
+            if name == "supabase":
+                attrs.update(tables=self.tables, lock=threading.Lock(), next_id=[0])
+            handler = type(base.__name__, (base,), attrs)
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name=f"fake-{name}", daemon=True).start()
+            self.servers[name] = server
+
+        smtp_handler = type("SMTPHandler", (SMTPHandler,), {"config": self.configs["smtp"], "sent": self.sent_emails})
+        smtp = _ThreadingTCPServer(("127.0.0.1", 0), smtp_handler)
+        threading.Thread(target=smtp.serve_forever, name="fake-smtp", daemon=True).start()
+        self.servers["smtp"] = smtp
+        return self
+
+    def port(self, name):
+        return self.servers[name].server_address[1]
+
+    def environment(self):
+        """Environment variables that point Sentinel's modules at these fakes."""
+        return {
+            "WEATHER_API_KEY": "bench",
+            "NEWS_API_KEY": "bench",
+            "OPENWEATHER_URL": f"http://127.0.0.1:{self.port('openweather')}/data/2.5/weather",
+            "NEWSAPI_URL": f"http://127.0.0.1:{self.port('newsapi')}/v2/everything",
+            "NOMINATIM_DOMAIN": f"127.0.0.1:{self.port('nominatim')}",
+            "NOMINATIM_SCHEME": "http",
+            "OPENAI_API_KEY": "sk-bench",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{self.port('openai')}/v1",
+            "SUPABASE_URL": f"http://127.0.0.1:{self.port('supabase')}",
+            # Any JWT-shaped string passes supabase-py's key check
+            "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYmVuY2gifQ.bench",
+            "SMTP_SERVER": "127.0.0.1",
+            "SMTP_PORT": str(self.port("smtp")),
+            "SMTP_STARTTLS": "0",
+            "EMAIL_USER": "sentinel@bench.local",
+            "EMAIL_PASS": "bench",
+        }
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
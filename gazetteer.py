@@ -0,0 +1,303 @@
+import os
+import re
+import json
+import math
+import mmap
+import struct
+import hashlib
+import threading
+from collections import deque, namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from metrics import inc
+
+# --- OFFLINE GAZETTEER ---
+# Articles are fetched per asset city, but the event they report is often
+# somewhere else: another district, another city, another port. Place names in
+# the headline and summary locate it without a geocoding round trip.
+#
+# The place list (bundled gazetteer.tsv, or a GeoNames cities*.txt dump) is
+# compiled once into an index file: a word-level Aho-Corasick automaton over
+# every place name, stored as flat arrays. The file is memory-mapped and matched
+# in place, so opening it builds nothing, and every process shares the pages.
+# One pass over the words of an article finds all the names in it.
+#
+#   GAZETTEER_SOURCE=gazetteer.tsv              the place list ("" disables locating)
+#   GAZETTEER_INDEX=sentinel_gazetteer.idx      compiled index, rebuilt when the source changes
+#   sentinel_gazetteer_total{result="located"|"not_found"}
+
+GAZETTEER_SOURCE = os.getenv("GAZETTEER_SOURCE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.tsv"))
+GAZETTEER_INDEX = os.getenv("GAZETTEER_INDEX", "sentinel_gazetteer.idx")
+
+# A single-word name needs this many letters, and mustn't be an everyday word:
+# GeoNames has towns called Of, Police, Mobile, Reading...
+MIN_NAME_CHARS = 4
+_COMMON_WORDS = frozenset({
+    "police", "mobile", "reading", "split", "nice", "bath", "orange", "union", "independence", "commerce",
+    "industry", "enterprise", "progress", "liberty", "mission", "march", "university", "central", "north",
+    "south", "east", "west", "port", "city", "said", "sale", "along", "over", "more", "most", "little",
+})
+
+# How far from its centre an event "in" a place may be, from its population
+PLACE_EXTENT_MIN_KM = 2.0
+PLACE_EXTENT_MAX_KM = 30.0
+
+_MAGIC = b"SNTLGAZ1"
+_EMPTY = 0xFFFFFFFF
+_MIX = 0x9E3779B97F4A7C15
+_WORD = re.compile(r"[^\W_]+")
+# Section dtype -> memoryview typecode (the index is a local cache, read on the machine that wrote it)
+_TYPECODES = {"<u4": "I", "<i4": "i", "<u8": "Q", "<f8": "d", "u1": "B"}
+
+class Place(namedtuple("Place", "name lat lon population")):
+    __slots__ = ()
+
+    @property
+    def extent_km(self):
+        """Rough radius of the place: an event reported there is somewhere within this of its centre."""
+        return min(PLACE_EXTENT_MAX_KM, max(PLACE_EXTENT_MIN_KM, 0.015 * math.sqrt(self.population)))
+
+@lru_cache(maxsize=65536)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _tokens(text):
+    return [word.casefold() for word in _WORD.findall(text)]
+
+def _read_source(path):
+    """(name, lat, lon, population, alternate names) per place, from a gazetteer.tsv-style file or a GeoNames dump."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) >= 19:  # GeoNames: id, name, asciiname, alternatenames, lat, lon, ... population (15)
+                yield cols[1], float(cols[4]), float(cols[5]), int(cols[14] or 0), [cols[2], *cols[3].split(",")]
+            else:
+                yield cols[0], float(cols[1]), float(cols[2]), int(cols[3] or 0), cols[4].split(",") if len(cols) > 4 else []
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+def build_index(source, index_path):
+    """Compiles the place list at source into the index file at index_path (replaced atomically)."""
+    places, names = [], {}  # names: word tuple -> place ids
+    for name, lat, lon, population, alternates in _read_source(source):
+        place_id = len(places)
+        places.append((name, lat, lon, population))
+        for variant in (name, *alternates):
+            words = tuple(_tokens(variant))
+            if not words or (len(words) == 1 and (len(words[0]) < MIN_NAME_CHARS or words[0] in _COMMON_WORDS)):
+                continue
+            ids = names.setdefault(words, [])
+            if place_id not in ids:
+                ids.append(place_id)
+
+    # Trie over the words of every name; state 0 is the root
+    children, out, depth = [{}], [-1], [0]
+    for name_id, words in enumerate(names):
+        state = 0
+        for word in words:
+            token = _token_hash(word)
+            child = children[state].get(token)
+            if child is None:
+                child = len(children)
+                children[state][token] = child
+                children.append({})
+                out.append(-1)
+                depth.append(depth[state] + 1)
+            state = child
+        out[state] = name_id
+
+    # Failure links (longest proper suffix that is also a trie path) and output
+    # links (nearest suffix state that ends a name), breadth first
+    fail, out_link = [0] * len(children), [-1] * len(children)
+    queue = deque(children[0].values())
+    while queue:
+        state = queue.popleft()
+        for token, child in children[state].items():
+            suffix = fail[state]
+            while suffix and token not in children[suffix]:
+                suffix = fail[suffix]
+            fail[child] = children[suffix].get(token, 0)
+            out_link[child] = fail[child] if out[fail[child]] >= 0 else out_link[fail[child]]
+            queue.append(child)
+
+    # Transitions in an open-addressed hash table keyed by (state, word hash), at most half full
+    edges = [(state, token, child) for state, kids in enumerate(children) for token, child in kids.items()]
+    size = 1 << max(4, (2 * len(edges) - 1).bit_length())
+    edge_state, edge_token, edge_child = [_EMPTY] * size, [0] * size, [0] * size
+    for state, token, child in edges:
+        slot = (token ^ (state * _MIX)) & (size - 1)
+        while edge_state[slot] != _EMPTY:
+            slot = (slot + 1) & (size - 1)
+        edge_state[slot], edge_token[slot], edge_child[slot] = state, token, child
+
+    labels = [name.encode("utf-8") for name, _, _, _ in places]
+    name_places = [ids for ids in names.values()]
+    sections = {
+        "edge_state": np.array(edge_state, dtype="<u4"),
+        "edge_token": np.array(edge_token, dtype="<u8"),
+        "edge_child": np.array(edge_child, dtype="<u4"),
+        "fail": np.array(fail, dtype="<u4"),
+        "out": np.array(out, dtype="<i4"),
+        "out_link": np.array(out_link, dtype="<i4"),
+        "depth": np.array(depth, dtype="<u4"),
+        "name_first": np.cumsum([0] + [len(ids) for ids in name_places], dtype="<u4"),
+        "name_places": np.array([i for ids in name_places for i in ids], dtype="<u4"),
+        "lat": np.array([p[1] for p in places], dtype="<f8"),
+        "lon": np.array([p[2] for p in places], dtype="<f8"),
+        "population": np.array([p[3] for p in places], dtype="<u4"),
+        "label_first": np.cumsum([0] + [len(label) for label in labels], dtype="<u4"),
+        "labels": np.frombuffer(b"".join(labels), dtype="u1"),
+    }
+
+    layout, offset = {}, 0
+    for name, array in sections.items():
+        layout[name] = [offset, _TYPECODES[array.dtype.str.lstrip("|")], len(array)]
+        offset += -(-array.nbytes // 8) * 8
+    header = json.dumps({"source": _source_stamp(source), "places": len(places), "names": len(names),
+                         "states": len(children), "sections": layout}).encode("utf-8")
+
+    partial = f"{index_path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(_MAGIC + struct.pack("<Q", len(header)) + header)
+        f.write(b"\0" * (-f.tell() % 8))
+        for array in sections.values():
+            f.write(array.tobytes())
+            f.write(b"\0" * (-f.tell() % 8))
+    os.replace(partial, index_path)
+
+class Gazetteer:
+    """A compiled index, memory-mapped read-only; any number of threads can match against it."""
+
+    def __init__(self, index_path):
+        with open(index_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != _MAGIC:
+            self._map.close()
+            raise ValueError(f"{index_path} is not a gazetteer index")
+        (length,) = struct.unpack_from("<Q", self._map, 8)
+        self.header = json.loads(self._map[16:16 + length])
+        base = -(-(16 + length) // 8) * 8
+        view = memoryview(self._map)
+        for name, (offset, typecode, count) in self.header["sections"].items():
+            start = base + offset
+            setattr(self, f"_{name}", view[start:start + count * struct.calcsize(typecode)].cast(typecode))
+        self._mask = len(self._edge_state) - 1
+
+    def __len__(self):
+        return self.header["places"]
+
+    def _matches(self, words):
+        """(start, end, name id) of the names in the word list, overlapping ones included."""
+        edge_state, edge_token, edge_child, mask = self._edge_state, self._edge_token, self._edge_child, self._mask
+        fail, out, out_link = self._fail, self._out, self._out_link
+        found = []
+        state = 0
+        for pos, word in enumerate(words):
+            if not state and word[0].islower():
+                continue  # A name can continue with a lowercase word ("Vasco da Gama") but not start with one
+            token = _token_hash(word.casefold())
+            while True:
+                # Transition lookup: linear probing from the (state, token) slot; 0 = no such edge
+                slot, child = (token ^ (state * _MIX)) & mask, 0
+                while edge_state[slot] != _EMPTY:
+                    if edge_state[slot] == state and edge_token[slot] == token:
+                        child = edge_child[slot]
+                        break
+                    slot = (slot + 1) & mask
+                if child or not state:
+                    break
+                state = fail[state]
+            state = child
+            hit = state if out[state] >= 0 else out_link[state]
+            while hit >= 0:
+                found.append((pos + 1 - self._depth[hit], pos + 1, out[hit]))
+                hit = out_link[hit]
+        return found
+
+    def _place(self, place_id):
+        label = bytes(self._labels[self._label_first[place_id]:self._label_first[place_id + 1]]).decode("utf-8")
+        return Place(label, self._lat[place_id], self._lon[place_id], self._population[place_id])
+
+    def mentions(self, text):
+        """
+        [(name as written, [Place, ...])] for the place names in text, in order. Where
+        names overlap the longest wins ("New Delhi", not "Delhi"); names starting
+        with a lowercase letter are ordinary words, not places.
+        """
+        words = _WORD.findall(text or "")
+        found, taken_until = [], 0
+        for start, end, name_id in sorted(self._matches(words), key=lambda m: (m[0], -m[1])):
+            if start < taken_until or words[start][0].islower():
+                continue
+            ids = self._name_places[self._name_first[name_id]:self._name_first[name_id + 1]]
+            found.append((" ".join(words[start:end]), [self._place(i) for i in ids]))
+            taken_until = end
+        return found
+
+    def locate(self, headline, summary=None, near=None):
+        """
+        The Place an article is about: the first place named in the headline, else
+        in the summary; None if neither names one. A name shared by several places
+        resolves to the one nearest near (lat, lon), else the most populous.
+        """
+        for text in (headline, summary):
+            for _, places in self.mentions(text):
+                if len(places) == 1:
+                    return places[0]
+                if near is None:
+                    return max(places, key=lambda p: p.population)
+                return min(places, key=lambda p: _degrees_apart(near, p))
+        return None
+
+    def close(self):
+        for name in self.header["sections"]:
+            getattr(self, f"_{name}").release()
+        self._map.close()
+
+def _degrees_apart(near, place):
+    # Good enough to tell namesakes apart, which are hundreds of km away from each other
+    return (near[0] - place.lat) ** 2 + ((near[1] - place.lon) * math.cos(math.radians(near[0]))) ** 2
+
+def open_gazetteer(source=GAZETTEER_SOURCE, index_path=GAZETTEER_INDEX):
+    """The index of source, compiled first if index_path is missing or was built from another version of it."""
+    stamp = _source_stamp(source)
+    try:
+        gazetteer = Gazetteer(index_path)
+        if gazetteer.header["source"] == stamp:
+            return gazetteer
+        gazetteer.close()
+    except (OSError, ValueError, KeyError):
+        pass
+    build_index(source, index_path)
+    return Gazetteer(index_path)
+
+_default = None
+_default_lock = threading.Lock()
+
+def default_gazetteer():
+    """The shared Gazetteer for GAZETTEER_SOURCE, opened on first use; None if there is no source."""
+    global _default
+    if _default is None and GAZETTEER_SOURCE:
+        with _default_lock:
+            if _default is None:
+                try:
+                    _default = open_gazetteer()
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Gazetteer unavailable ({e}); events stay at the search location.")
+                    _default = False
+    return _default or None
+
+def locate_event(article_input, near=None):
+    """Place that an article ({'headline', 'summary'}) reports on, or None; see Gazetteer.locate()."""
+    gazetteer = default_gazetteer()
+    if gazetteer is None:
+        return None
+    place = gazetteer.locate(article_input.get('headline'), article_input.get('summary'), near)
+    inc("sentinel_gazetteer_total", result="located" if place else "not_found")
+    return place
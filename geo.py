@@ -0,0 +1,138 @@
+import math
+
+import numpy as np
+
+# --- GEOHASH HELPERS ---
+# Geohash turns a lat/lon into a short string; nearby points share a prefix.
+# Used as the cache key for anything that only depends on rough location.
+#
+#   precision 5 ~ 4.9km x 4.9km    precision 6 ~ 1.2km x 0.6km
+#   precision 7 ~ 153m x 153m      precision 8 ~ 38m x 19m
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(lat, lon, precision=7):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash interleaves bits, starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+def geohash_decode(geohash):
+    """Centre (lat, lon) of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+# --- RADIUS INDEX ---
+# Points that each have their own radius (assets and their concern zones), and
+# the question "whose radius covers this spot?". Points sit in a lat/lon grid
+# with cells at least as wide as nearly every radius, so a query only measures
+# the points in its own and neighbouring cells, all at once with NumPy. The few
+# points with a radius larger than a cell are always measured.
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+MIN_CELL_KM = 1.0
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance (km) from (lat, lon) to each of the lats/lons arrays."""
+    lat1, lat2 = np.radians(lat), np.radians(lats)
+    d_lat = lat2 - lat1
+    d_lon = np.radians(lons) - np.radians(lon)
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+class RadiusIndex:
+    """Grid index over points with a radius (km) each; built once, read by any thread."""
+
+    def __init__(self, lats, lons, radii_km):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.radii = np.asarray(radii_km, dtype=float)
+
+        # Cells fit the 95th percentile radius; anything bigger goes on the wide list
+        cell_km = max(float(np.percentile(self.radii, 95)) if len(self.radii) else 0.0, MIN_CELL_KM)
+        self.cell_deg = cell_km / KM_PER_DEG_LAT
+        self.columns = math.ceil(360 / self.cell_deg)
+        wide = self.radii > cell_km
+        self.wide = np.flatnonzero(wide)
+
+        narrow = np.flatnonzero(~wide)
+        rows, cols = self._cell(self.lats[narrow], self.lons[narrow])
+        order = np.lexsort((cols, rows))
+        keys, starts = np.unique(np.stack([rows[order], cols[order]], axis=1), axis=0, return_index=True)
+        groups = np.split(narrow[order], starts[1:])
+        self.cells = {(int(row), int(col)): group for (row, col), group in zip(keys, groups)}
+
+    def _cell(self, lats, lons):
+        rows = np.floor(np.asarray(lats) / self.cell_deg).astype(int)
+        cols = np.floor((np.asarray(lons) + 180) / self.cell_deg).astype(int) % self.columns
+        return rows, cols
+
+    def _candidates(self, lat, lon, slack_km=0.0):
+        row, col = (int(v) for v in self._cell(lat, lon))
+        # One cell of latitude covers any narrow radius (plus more for the slack);
+        # longitude cells shrink towards the poles
+        span = 1 + math.ceil(slack_km / (self.cell_deg * KM_PER_DEG_LAT))
+        widest_lat = min(89.9, abs(lat) + (span + 1) * self.cell_deg)
+        reach = math.ceil(span / math.cos(math.radians(widest_lat)))
+        if 2 * reach + 1 >= self.columns:
+            found = [group for (r, _), group in self.cells.items() if abs(r - row) <= span]
+        else:
+            found = [self.cells[key] for key in
+                     ((r, (col + dc) % self.columns) for r in range(row - span, row + span + 1)
+                      for dc in range(-reach, reach + 1))
+                     if key in self.cells]
+        if len(self.wide):
+            found.append(self.wide)
+        return np.sort(np.concatenate(found)) if found else np.empty(0, dtype=int)
+
+    def within(self, lat, lon, slack_km=0.0):
+        """
+        (indices, distances in km) of the points whose radius covers (lat, lon), in index order.
+        slack_km widens every radius, for a spot only known to within that distance.
+        """
+        candidates = self._candidates(lat, lon, slack_km)
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        hit = distances <= self.radii[candidates] + slack_km
+        return candidates[hit], distances[hit]
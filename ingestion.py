@@ -1,67 +1,201 @@
 import os
+import re
+import json
+import time
+import zlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 from datetime import datetime
 from geopy.geocoders import Nominatim
+from metrics import instrumented, inc, add_collector
+from ratelimit import rate_limited
+from replay import replayable, replaying, recording, replayed, record, request_key
+from cache import PersistentCache
+from geo import geohash_encode
+from records import Article, Weather
+
+# orjson parses provider JSON several times faster than the stdlib; optional
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 load_dotenv()
 
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
+# Provider endpoints (overridable so benchmark.py can point them at local fakes)
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+NEWSAPI_URL = os.getenv("NEWSAPI_URL", "https://newsapi.org/v2/everything")
+NOMINATIM_DOMAIN = os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.getenv("NOMINATIM_SCHEME", "https")
+
+# --- HTTP SESSION ---
+# One keep-alive session for every provider call: connections are reused across
+# calls and threads (no new TCP+TLS handshake per request). Pools are bounded,
+# so extra threads wait for a free connection instead of opening more.
+# 429/5xx and connection errors are retried with jittered exponential backoff,
+# honouring the provider's Retry-After header.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))      # connections per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+
+class _CountingRetry(Retry):
+    """Retry that records every retry it makes in the metrics."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        reason = str(response.status) if response is not None else type(error).__name__
+        inc("sentinel_http_retries_total", host=_pool.host if _pool else "-", reason=reason)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def _build_session():
+    retry = _CountingRetry(
+        total=HTTP_MAX_RETRIES,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        backoff_factor=0.5,         # 0.5s, 1s, 2s ...
+        backoff_jitter=0.5,         # + up to 0.5s random, so threads don't retry in lockstep
+        backoff_max=30,
+        respect_retry_after_header=True,
+        raise_on_status=False,      # Last response is returned; raise_for_status() reports it
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE, pool_block=True, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_session = _build_session()
+
+def http_stats():
+    """Per-host request vs connection counts for the shared session (reused = handshakes saved)."""
+    stats = {}
+    for adapter in set(_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+            entry = stats.setdefault(host, {"requests": 0, "connections": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+    for entry in stats.values():
+        entry["reused"] = max(entry["requests"] - entry["connections"], 0)
+    return stats
+
+def _http_gauges():
+    gauges = []
+    for host, entry in http_stats().items():
+        for field in ("requests", "connections", "reused"):
+            gauges.append((f"sentinel_http_{field}", {"host": host}, entry[field]))
+    return gauges
+
+add_collector(_http_gauges)
+
 # --- FETCH FUNCTIONS (The "Raw" Data) ---
 
+@rate_limited("openweather")
+@instrumented("fetch_weather")
+@replayable("openweather", miss_as_error=True)
 def fetch_weather(city_name):
     """Fetches current weather for a specific city name."""
     if not WEATHER_API_KEY:
         return {"error": "Missing Weather API Key in .env"}
     
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={WEATHER_API_KEY}&units=metric"
+    url = f"{OPENWEATHER_URL}?q={city_name}&appid={WEATHER_API_KEY}&units=metric"
     try:
         # TIMEOUT ADDED: Stops hanging after 10 seconds
-        response = requests.get(url, timeout=10)
+        response = _session.get(url, timeout=10)
         response.raise_for_status() 
-        return response.json()
+        return _json_loads(response.content)
     except Exception as e:
         return {"error": str(e)}
 
+@rate_limited("openweather")
+@instrumented("fetch_weather_coords")
+@replayable("openweather", miss_as_error=True)
 def fetch_weather_coords(lat, lon):
     """Fetches weather using precise Lat/Lon coordinates."""
     if not WEATHER_API_KEY:
         return {"error": "Missing Weather API Key in .env"}
     
-    url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
+    url = f"{OPENWEATHER_URL}?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units=metric"
     try:
-        response = requests.get(url, timeout=10)
+        response = _session.get(url, timeout=10)
         response.raise_for_status()
-        return response.json()
+        return _json_loads(response.content)
     except Exception as e:
         return {"error": str(e)}
 
+# --- REVERSE GEOCODING (cached) ---
+# Assets don't move, and Nominatim allows ~1 request/second, so city names are
+# cached on disk by geohash cell and shared by monitor.py and app.py.
+GEOCODE_CACHE_PRECISION = int(os.getenv("GEOCODE_CACHE_PRECISION", "7"))  # ~150m cells
+GEOCODE_CACHE = PersistentCache(
+    "geocode",
+    ttl=int(os.getenv("GEOCODE_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+    max_entries=int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "100000")),
+)
+
+_geolocator = Nominatim(user_agent="sentinel_risk_agent_v1", timeout=10,
+                        domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
+
+@rate_limited("nominatim")
+@instrumented("reverse_geocode")
+@replayable("nominatim")
+def _nominatim_city(lat, lon):
+    """One Nominatim round trip. Raises on network errors; None means 'no city here'."""
+    location = _geolocator.reverse((lat, lon), language='en', exactly_one=True)
+    if location:
+        address = location.raw.get('address', {})
+        return (address.get('city') or 
+                address.get('town') or 
+                address.get('village') or 
+                address.get('county') or
+                address.get('state_district'))
+    return None
+
 def reverse_geocode(lat, lon):
     """Converts Lat/Lon -> City Name."""
+    key = geohash_encode(lat, lon, GEOCODE_CACHE_PRECISION)
+    cached = GEOCODE_CACHE.get(key)
+    if cached is not None:
+        return cached["city"]
+
     try:
-        geolocator = Nominatim(user_agent="sentinel_risk_agent_v1", timeout=10)
-        location = geolocator.reverse((lat, lon), language='en', exactly_one=True)
-        
-        if location:
-            address = location.raw.get('address', {})
-            return (address.get('city') or 
-                    address.get('town') or 
-                    address.get('village') or 
-                    address.get('county') or
-                    address.get('state_district'))
+        city = _nominatim_city(lat, lon)
     except Exception as e:
         print(f"Geocoding error: {e}")
-        return None
-    return None
+        return None  # Not cached, so the next call retries
+
+    GEOCODE_CACHE.set(key, {"city": city})
+    return city
 
-def fetch_news(topic, location=None):
-    """Fetches news, strictly restricted to a specific location."""
+def _quote(location):
+    return f'"{location}"' if " " in location else location
+
+@rate_limited("newsapi")
+@instrumented("fetch_news")
+@replayable("newsapi", miss_as_error=True)
+def fetch_news(topic, location=None, since=None):
+    """
+    Fetches news, strictly restricted to a specific location.
+    location may also be a list of places, which are OR-combined into one query.
+    since (ISO timestamp) limits results to articles published at or after it.
+    """
     if not NEWS_API_KEY:
         return {"error": "Missing News API Key in .env"}
     
-    if location:
+    if isinstance(location, (list, tuple)) and len(location) > 1:
+        query = f"{topic} AND ({' OR '.join(_quote(place) for place in location)})"
+    elif isinstance(location, (list, tuple)):
+        query = f"{topic} AND {location[0]}" if location else topic
+    elif location:
         query = f"{topic} AND {location}"
     else:
         query = topic
@@ -69,7 +203,7 @@ def fetch_news(topic, location=None):
     print(f"   --> Querying NewsAPI for: '{query}'...")
 
     url = (
-        f"https://newsapi.org/v2/everything?"
+        f"{NEWSAPI_URL}?"
         f"q={query}&"
         f"searchIn=title,description&"
         f"sortBy=publishedAt&"
@@ -77,33 +211,144 @@ def fetch_news(topic, location=None):
         f"language=en&"
         f"pageSize=100"
     )
+    if since:
+        url += f"&from={since}"
     
     try:
         # TIMEOUT ADDED
-        response = requests.get(url, timeout=10)
+        response = _session.get(url, timeout=10)
         response.raise_for_status()
-        return response.json()
+        return _json_loads(response.content)
     except Exception as e:
         print(f"   [!] NewsAPI Error: {e}")
         return {"error": str(e)}
 
-# --- PARSER FUNCTIONS (Unchanged) ---
+# --- BATCHED NEWS PLANNER ---
+# Co-located assets ask NewsAPI the same question. The planner collapses
+# identical (topic, city) requests into one query and OR-combines cities with
+# only a few assets, then fans the articles back out to each requester.
+NEWS_OWN_QUERY_MIN_ASSETS = int(os.getenv("NEWS_OWN_QUERY_MIN_ASSETS", "3"))  # Cities this busy keep their own query
+NEWS_OR_COMBINE_MAX = int(os.getenv("NEWS_OR_COMBINE_MAX", "4"))              # Max cities per OR query (1 = never combine)
+
+def plan_news_queries(requests):
+    """
+    requests: list of (topic, location) pairs, one per asset (duplicates expected).
+    Returns [(topic, [locations])]: one entry per NewsAPI call to make.
+    An empty location list means the plain topic query.
+    """
+    counts = {}
+    for topic, location in requests:
+        key = (topic, location or None)
+        counts[key] = counts.get(key, 0) + 1
+
+    plan = []
+    small = {}
+    for (topic, location), count in counts.items():
+        if location is None:
+            plan.append((topic, []))
+        elif count >= NEWS_OWN_QUERY_MIN_ASSETS or NEWS_OR_COMBINE_MAX <= 1:
+            plan.append((topic, [location]))
+        else:
+            small.setdefault(topic, []).append(location)
+
+    for topic, locations in small.items():
+        for i in range(0, len(locations), NEWS_OR_COMBINE_MAX):
+            plan.append((topic, locations[i:i + NEWS_OR_COMBINE_MAX]))
+    return plan
+
+def _split_by_location(news_raw, locations):
+    """Fans a combined query's articles out to the place(s) each one mentions."""
+    if len(locations) <= 1 or "error" in news_raw:
+        return {loc: news_raw for loc in locations}
+
+    # Whole-name matches only, so "York" doesn't claim articles about "Yorkton"
+    patterns = {loc: re.compile(rf"(?<!\w){re.escape(loc.lower())}(?!\w|\.\w)") for loc in locations}
+    split = {loc: [] for loc in locations}
+    for article in news_raw.get("articles", []):
+        text = f"{article.get('title') or ''} {article.get('description') or ''}".lower()
+        mentioned = [loc for loc in locations if patterns[loc].search(text)]
+        # NewsAPI matched the article, just not on an exact name: keep it for everyone
+        for loc in mentioned or locations:
+            split[loc].append(article)
+    return {loc: {"status": news_raw.get("status", "ok"), "articles": articles}
+            for loc, articles in split.items()}
+
+def fetch_news_batch(requests, since=None):
+    """
+    Batched fetch_news() for many (topic, location) requests at once.
+    since: optional {(topic, location): ISO timestamp}; a combined query starts at
+    the oldest of its locations' timestamps (a location without one means no limit).
+    Returns {(topic, location): raw NewsAPI response}, same shape as fetch_news().
+    """
+    since = since or {}
+    if replaying():
+        # Query grouping depends on batch timing, so replays are served per location
+        return {(topic, location or None): replayed(
+                    "newsapi_location", request_key(topic, location or None, since.get((topic, location or None))),
+                    miss_as_error=True)
+                for topic, location in requests}
+
+    responses = {}
+    for topic, locations in plan_news_queries(requests):
+        starts = [since.get((topic, loc)) for loc in locations or [None]]
+        start = None if None in starts else min(starts)
+        started = time.perf_counter()
+        news_raw = fetch_news(topic, location=locations or None, since=start)
+        seconds = time.perf_counter() - started
+        split = _split_by_location(news_raw, locations) if locations else {None: news_raw}
+        for location, split_raw in split.items():
+            responses[(topic, location)] = split_raw
+            if recording():
+                record("newsapi_location", request_key(topic, location, since.get((topic, location))),
+                       split_raw, seconds)
+    return responses
+
+# --- HIGH-WATER MARKS (incremental news) ---
+# A mark is {'published_at': newest publishedAt seen, 'urls': URLs seen at exactly
+# that time}. NewsAPI's 'from' filter is inclusive, so the URLs break ties.
+
+def _published(article):
+    return (article.get("publishedAt") or "")[:19]
+
+def new_articles(news_raw, mark):
+    """The part of a raw NewsAPI response newer than mark (same response shape)."""
+    if not mark or "error" in news_raw:
+        return news_raw
+    seen = set(mark["urls"])
+    fresh = [a for a in news_raw.get("articles", [])
+             if _published(a) > mark["published_at"]
+             or (_published(a) == mark["published_at"] and a.get("url") not in seen)]
+    return {"status": news_raw.get("status", "ok"), "articles": fresh}
+
+def advance_mark(mark, news_raw):
+    """mark moved past every article in news_raw."""
+    if "error" in news_raw:
+        return mark
+    mark = dict(mark) if mark else {"published_at": "", "urls": []}
+    for article in news_raw.get("articles", []):
+        published = _published(article)
+        if published > mark["published_at"]:
+            mark = {"published_at": published, "urls": [article.get("url")]}
+        elif published == mark["published_at"] and article.get("url") not in mark["urls"]:
+            mark["urls"] = mark["urls"] + [article.get("url")]
+    return mark if mark["published_at"] else None
+
+# --- PARSER FUNCTIONS ---
 
 def parse_weather_risk(api_response):
     if "error" in api_response:
         return api_response
 
     try:
-        data = {
-            "location": api_response.get("name"),
-            "lat": api_response["coord"]["lat"],
-            "lon": api_response["coord"]["lon"],
-            "temp_c": api_response["main"]["temp"],
-            "condition": api_response["weather"][0]["description"],
-            "wind_speed_ms": api_response["wind"]["speed"],
-            "visibility_km": api_response.get("visibility", 10000) / 1000
-        }
-        return data
+        return Weather(
+            location=api_response.get("name"),
+            lat=api_response["coord"]["lat"],
+            lon=api_response["coord"]["lon"],
+            temp_c=api_response["main"]["temp"],
+            condition=api_response["weather"][0]["description"],
+            wind_speed_ms=api_response["wind"]["speed"],
+            visibility_km=api_response.get("visibility", 10000) / 1000,
+        )
     except Exception as e:
         return {"error": f"Parsing failed: {str(e)}"}
 
@@ -116,12 +361,58 @@ def parse_news_risk(api_response):
     raw_articles = [a for a in api_response.get("articles", []) if a.get("title")]
 
     for article in raw_articles:
-        processed_articles.append({
-            "Headline": article.get("title"),
-            "Source": article.get("source", {}).get("name"),
-            "Published": article.get("publishedAt", "")[:19].replace("T", " "),
-            "URL": article.get("url"),
-            "summary": article.get("description")
-        })
+        processed_articles.append(Article(
+            Headline=article.get("title"),
+            Source=(article.get("source") or {}).get("name"),
+            Published=(article.get("publishedAt") or "")[:19].replace("T", " "),
+            URL=article.get("url"),
+            summary=article.get("description"),
+        ))
             
-    return processed_articles
\ No newline at end of file
+    return processed_articles
+
+# --- WEATHER CACHE (grid cells) ---
+# OpenWeather data is coarse (station/model grid) and refreshes every ~10 minutes,
+# so assets in the same geohash cell share one parsed reading. The cache lives in
+# the shared SQLite file, so the dashboard and the monitor reuse each other's calls.
+WEATHER_CACHE_PRECISION = int(os.getenv("WEATHER_CACHE_PRECISION", "5"))  # ~4.9km cells
+WEATHER_CACHE = PersistentCache(
+    "weather",
+    ttl=int(os.getenv("WEATHER_CACHE_TTL_MINUTES", "10")) * 60,
+    max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "50000")),
+)
+# Striped locks: concurrent workers asking for the same cell wait for one fetch
+_weather_locks = [threading.Lock() for _ in range(64)]
+
+def get_weather(lat, lon):
+    """
+    parse_weather_risk(fetch_weather_coords(lat, lon)), served from the cell cache when fresh.
+    lat/lon in the result are always the caller's own coordinates. Errors are not cached.
+    """
+    key = geohash_encode(lat, lon, WEATHER_CACHE_PRECISION)
+    with _weather_locks[zlib.crc32(key.encode()) % len(_weather_locks)]:
+        cached = WEATHER_CACHE.get(key)
+        if cached is not None:
+            weather = Weather.from_dict(cached)
+        else:
+            weather = parse_weather_risk(fetch_weather_coords(lat, lon))
+            if "error" in weather:
+                return weather
+            WEATHER_CACHE.set(key, weather.to_dict())
+
+    # risk_engine treats the weather coordinates as the asset's position
+    weather.lat, weather.lon = lat, lon
+    return weather
+
+def bucket_weather(weather):
+    """
+    Coarse signature of a parse_weather_risk() result. Small drifts in temperature,
+    wind or visibility land in the same bucket, so "same weather" can be compared.
+    """
+    if not weather or "error" in weather:
+        return "unavailable"
+
+    temp_band = int(weather.get("temp_c", 0) // 5) * 5          # 5C bands
+    wind_band = int(weather.get("wind_speed_ms", 0) // 5) * 5   # 5 m/s bands
+    visibility_band = "low" if weather.get("visibility_km", 10) < 2 else "ok"
+    return f"{weather.get('condition')}|t{temp_band}|w{wind_band}|v{visibility_band}"
@@ -0,0 +1,158 @@
+import os
+import math
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+
+# --- SHARDED MONITOR LEASES ---
+# Assets are hashed into a fixed number of partitions. Each monitor process
+# (worker) holds a time-limited lease on a fair share of the partitions and only
+# scans assets in partitions it owns. Leases live in a small SQLite database that
+# every worker opens; a worker that stops heart-beating lets its leases expire
+# and the survivors pick them up on their next rebalance.
+
+LEASE_DB_PATH = os.getenv("SENTINEL_LEASE_DB", "sentinel_leases.db")
+LEASE_PARTITIONS = int(os.getenv("SENTINEL_PARTITIONS", "64"))
+LEASE_TTL_SECONDS = int(os.getenv("SENTINEL_LEASE_TTL", "300"))
+
+def partition_for(asset, partitions=LEASE_PARTITIONS):
+    """Stable partition number for an asset (same answer in every process)."""
+    key = str(asset.get('id') or asset.get('name'))
+    return zlib.crc32(key.encode("utf-8")) % partitions
+
+class LeaseManager:
+    def __init__(self, worker_id=None, db_path=LEASE_DB_PATH,
+                 partitions=LEASE_PARTITIONS, ttl=LEASE_TTL_SECONDS):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.db_path = db_path
+        self.partitions = partitions
+        self.ttl = ttl
+        self.owned = set()
+        self._stop = threading.Event()
+        self._heartbeat_thread = None
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("""CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat REAL NOT NULL)""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS leases (
+                partition INTEGER PRIMARY KEY,
+                worker_id TEXT NOT NULL,
+                expires_at REAL NOT NULL)""")
+        finally:
+            conn.close()
+
+    def rebalance(self):
+        """
+        Heartbeat + claim/release so this worker owns ceil(partitions / live workers).
+        Runs in one IMMEDIATE transaction, so two workers never claim the same partition.
+        Returns the set of partitions owned afterwards.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat) VALUES (?, ?)",
+                         (self.worker_id, now))
+            # Forget dead workers; their leases expire on their own
+            conn.execute("DELETE FROM workers WHERE heartbeat < ?", (now - self.ttl,))
+            live = conn.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+            fair_share = math.ceil(self.partitions / max(live, 1))
+
+            mine = [row[0] for row in conn.execute(
+                "SELECT partition FROM leases WHERE worker_id = ? AND expires_at >= ? ORDER BY partition",
+                (self.worker_id, now))]
+
+            # Give back partitions above our share so new workers can take them
+            surplus = mine[fair_share:]
+            if surplus:
+                conn.executemany("DELETE FROM leases WHERE partition = ? AND worker_id = ?",
+                                 [(p, self.worker_id) for p in surplus])
+                mine = mine[:fair_share]
+
+            # Claim free or expired partitions up to our share
+            if len(mine) < fair_share:
+                taken = {row[0] for row in conn.execute(
+                    "SELECT partition FROM leases WHERE expires_at >= ?", (now,))}
+                free = [p for p in range(self.partitions) if p not in taken]
+                mine.extend(free[:fair_share - len(mine)])
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO leases (partition, worker_id, expires_at) VALUES (?, ?, ?)",
+                [(p, self.worker_id, now + self.ttl) for p in mine])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        self.owned = set(mine)
+        return self.owned
+
+    def renew(self):
+        """Extends our current leases and heartbeat without changing ownership."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO workers (worker_id, heartbeat) VALUES (?, ?)",
+                         (self.worker_id, now))
+            conn.execute("UPDATE leases SET expires_at = ? WHERE worker_id = ? AND expires_at >= ?",
+                         (now + self.ttl, self.worker_id, now))
+            rows = conn.execute("SELECT partition FROM leases WHERE worker_id = ? AND expires_at >= ?",
+                                (self.worker_id, now)).fetchall()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        self.owned = {row[0] for row in rows}
+        return self.owned
+
+    def owns(self, asset):
+        return partition_for(asset, self.partitions) in self.owned
+
+    def still_owns(self, asset):
+        """Checks the lease table (not the local copy) right before side effects like alerts."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT worker_id, expires_at FROM leases WHERE partition = ?",
+                               (partition_for(asset, self.partitions),)).fetchone()
+        finally:
+            conn.close()
+        return bool(row) and row[0] == self.worker_id and row[1] >= time.time()
+
+    def start_heartbeat(self):
+        """Renews leases in the background every ttl/3 so long scans don't lose them."""
+        def beat():
+            while not self._stop.wait(self.ttl / 3):
+                try:
+                    self.renew()
+                except Exception as e:
+                    print(f"   ⚠️ Lease heartbeat failed: {e}")
+
+        self._heartbeat_thread = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def release_all(self):
+        """Hands every partition back immediately (clean shutdown)."""
+        self._stop.set()
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM leases WHERE worker_id = ?", (self.worker_id,))
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+        finally:
+            conn.close()
+        self.owned = set()
@@ -0,0 +1,230 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- SCAN METRICS ---
+# In-process counters and latency histograms for every external call, rendered
+# in the Prometheus text format. monitor.py serves them on METRICS_PORT and/or
+# writes them to METRICS_FILE.
+#
+#   sentinel_calls_total{stage, asset, outcome}            call count
+#   sentinel_call_seconds_total{stage, asset, outcome}     time spent
+#   sentinel_call_duration_seconds{stage, outcome}         latency histogram
+#
+# Histograms are not split by asset to keep series counts bounded.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_histograms = {}   # labels -> [bucket counts..., +Inf count, sum]
+_local = threading.local()
+_collectors = []   # callables returning [(name, labels dict, value)] gauges at render time
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+def inc(name, amount=1, **labels):
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(stage, seconds, outcome, asset=None):
+    """Records one finished call."""
+    asset = asset or current_asset() or "-"
+    inc("sentinel_calls_total", stage=stage, asset=asset, outcome=outcome)
+    inc("sentinel_call_seconds_total", seconds, stage=stage, asset=asset, outcome=outcome)
+
+    key = _labels_key({"stage": stage, "outcome": outcome})
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[len(DURATION_BUCKETS)] += 1
+        hist[-1] += seconds
+
+# --- ASSET CONTEXT ---
+# The asset currently being worked on by this thread, used as the 'asset' label.
+
+def current_asset():
+    return getattr(_local, "asset", None)
+
+@contextmanager
+def asset_context(asset_name):
+    previous = current_asset()
+    _local.asset = asset_name
+    try:
+        yield
+    finally:
+        _local.asset = previous
+
+# --- INSTRUMENTATION HELPERS ---
+
+def _default_failed(result):
+    return result is False or (isinstance(result, dict) and "error" in result)
+
+@contextmanager
+def track(stage):
+    """Times the block; an exception counts as outcome='error' (and is re-raised)."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started, outcome)
+
+def instrumented(stage, failed=_default_failed):
+    """
+    Decorator version of track() for functions that report failure in their
+    return value (e.g. {'error': ...} or False) instead of raising.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "error" if failed(result) else "ok"
+                return result
+            finally:
+                observe(stage, time.perf_counter() - started, outcome)
+        return wrapper
+    return decorator
+
+def add_collector(func):
+    """Registers a function whose gauges are read fresh on every render()."""
+    _collectors.append(func)
+
+# --- EXPORT ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    for collect in _collectors:
+        for name, labels, value in collect():
+            if name not in seen:
+                lines.append(f"# TYPE {name} gauge")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(_labels_key(labels))} {value:g}")
+
+    name = "sentinel_call_duration_seconds"
+    if histograms:
+        lines.append(f"# TYPE {name} histogram")
+    for labels, hist in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS, hist):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+        cumulative += hist[len(DURATION_BUCKETS)]
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]:g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+def stages():
+    with _lock:
+        return sorted({dict(labels)["stage"] for labels in _histograms})
+
+def quantile(stage, q):
+    """Approximate q-quantile (0..1) of a stage's latency across outcomes, interpolated inside buckets."""
+    with _lock:
+        merged = [0] * (len(DURATION_BUCKETS) + 1)
+        for labels, hist in _histograms.items():
+            if dict(labels)["stage"] == stage:
+                for i in range(len(merged)):
+                    merged[i] += hist[i]
+    total = sum(merged)
+    if not total:
+        return None
+
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for i, count in enumerate(merged):
+        upper = DURATION_BUCKETS[i] if i < len(DURATION_BUCKETS) else DURATION_BUCKETS[-1]
+        if count and cumulative + count >= rank:
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = upper
+    return DURATION_BUCKETS[-1]
+
+def call_count(stage, outcome=None):
+    with _lock:
+        return sum(value for (name, labels), value in _counters.items()
+                   if name == "sentinel_calls_total" and dict(labels)["stage"] == stage
+                   and (outcome is None or dict(labels)["outcome"] == outcome))
+
+def counter(name, **labels):
+    """Sum of a counter across all series matching the given labels."""
+    with _lock:
+        return sum(value for (key_name, key_labels), value in _counters.items()
+                   if key_name == name and labels.items() <= dict(key_labels).items())
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Keep scrapes out of the monitor's console
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serves GET /metrics from a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_file_writer(path, every_seconds=15):
+    """Rewrites the metrics file every few seconds (atomic replace, for node_exporter's textfile collector)."""
+    def write_loop():
+        while True:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(render())
+            os.replace(tmp_path, path)
+            time.sleep(every_seconds)
+
+    threading.Thread(target=write_loop, name="metrics-file", daemon=True).start()
@@ -1,118 +1,524 @@
 import os  # <--- THIS WAS MISSING
+import json
+import hashlib
+import threading
 import time
-import schedule
 import sys
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Import your existing modules
 from database import get_all_assets, save_analysis, save_alert
-from ingestion import fetch_weather_coords, fetch_news, parse_weather_risk, parse_news_risk, reverse_geocode
-from risk_engine import assess_news_risk
+from ingestion import get_weather, fetch_news_batch, new_articles, advance_mark, parse_news_risk, reverse_geocode, bucket_weather, http_stats
+from risk_engine import assess_stories_parallel, update_asset_registry, ASSESSMENT_CACHE, ASSETS
+from registry import asset_id
+from dedup import dedupe
+from records import Article
 from notifications import send_email_alert
+from pipeline import Stage, Pipeline
+from leasing import LeaseManager
+from cache import PersistentCache
+from scheduler import ScanScheduler, asset_key
+import metrics
 
 # --- TEST CONFIGURATION ---
 RISK_THRESHOLD = 0  # <--- SET TO 0 FOR TESTING (Normally 75)
-CHECK_INTERVAL_MINUTES = 60
+# How often the asset list is re-read from the database (new/removed assets).
+# Scan timing per asset comes from scheduler.py (SCAN_MIN/MAX_INTERVAL_MINUTES).
+ASSET_REFRESH_MINUTES = 5
 ALERT_RECIPIENT = "YOUR_EMAIL_HERE" # Fallback if not in .env
 
-def run_sentinel_scan():
+# --- PIPELINE CONFIGURATION ---
+# Worker threads per stage. Each stage talks to exactly one provider, so this
+# is also the per-provider concurrency limit. Nominatim's usage policy allows
+# a single client connection.
+STAGE_WORKERS = {
+    "weather": int(os.getenv("WORKERS_WEATHER", "8")),     # OpenWeather
+    "geocode": int(os.getenv("WORKERS_GEOCODE", "1")),     # Nominatim
+    "news": int(os.getenv("WORKERS_NEWS", "4")),           # NewsAPI
+    "score": int(os.getenv("WORKERS_SCORE", "8")),         # OpenAI
+    "persist": int(os.getenv("WORKERS_PERSIST", "4")),     # Supabase
+    "alert": int(os.getenv("WORKERS_ALERT", "2")),         # SMTP
+}
+# Bounded queue in front of each stage. When OpenAI or Supabase slow down the
+# queues fill up and earlier stages wait instead of buffering every asset.
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "32"))
+# The news stage collects up to NEWS_BATCH_SIZE assets (waiting at most
+# NEWS_BATCH_WAIT_SECONDS) so assets in the same or nearby cities share NewsAPI queries
+NEWS_BATCH_SIZE = int(os.getenv("NEWS_BATCH_SIZE", "32"))
+NEWS_BATCH_WAIT_SECONDS = float(os.getenv("NEWS_BATCH_WAIT_SECONDS", "0.5"))
+NEWS_TOPIC = "logistics supply chain"
+# Print live queue depths/throughput this often during a scan (seconds)
+PIPELINE_REPORT_SECONDS = float(os.getenv("PIPELINE_REPORT_SECONDS", "30"))
+
+# --- METRICS EXPORT ---
+# Prometheus text endpoint (http://host:METRICS_PORT/metrics) and/or a file
+# rewritten every few seconds. Both are off unless configured.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("METRICS_FILE")
+
+# --- SCAN BUDGET ---
+# A scan stops admitting new assets after this many minutes (0 = no limit).
+# Assets run most important / riskiest first, so whatever gets deferred is the
+# least critical work; deferred assets are first in line for the next scan.
+SCAN_BUDGET_MINUTES = float(os.getenv("SCAN_BUDGET_MINUTES", "15"))
+
+# Only one scan at a time; a scan that is triggered while another runs is skipped.
+_scan_lock = threading.Lock()
+
+# --- SHARDING ---
+# Set SENTINEL_SHARDED=1 (or pass --sharded) to run several monitors side by
+# side. Each one only scans the asset partitions it holds a lease on.
+LEASES = None
+
+# --- INCREMENTAL SCANS ---
+# What each asset looked like at its last scan: input fingerprint, weather bucket,
+# max risk, the articles scored (with their assessments) and the news high-water
+# mark. Only articles published after the mark are fetched and parsed; they are
+# ranked with the previously scored ones. Unchanged assets are not re-scored,
+# re-saved or re-alerted; known articles reuse their old assessment. The mark
+# only moves once a scan is saved, so deferred or failed scans lose no news.
+SCAN_STATE = PersistentCache("scan_state", ttl=7 * 24 * 3600)
+
+ARTICLE_FIELDS = ("Headline", "Source", "Published", "URL", "summary", "story_id")
+ASSESSMENT_FIELDS = ("risk_score", "severity", "reasoning", "action", "estimated_impact_radius", "impacted_asset",
+                     "target_asset")
+
+# --- ROUTED THREATS ---
+# An article that names another place is scored against the assets there
+# (risk_engine's 'target_asset', a registry id). If it targets another asset in
+# this scan, it alerts that asset (when this worker still holds its lease)
+# instead of counting toward the scanned asset's risk; any other threat counts
+# toward the scanned asset. Each (asset, article) pair alerts at most once per scan.
+_alerted = set()
+_alerted_lock = threading.Lock()
+
+def _first_alert(asset_name, art):
+    """True the first time this scan alerts asset_name about art."""
+    with _alerted_lock:
+        if (asset_name, article_key(art)) in _alerted:
+            return False
+        _alerted.add((asset_name, article_key(art)))
+        return True
+
+def article_key(art):
+    return art.get("URL") or art["Headline"]
+
+def scan_fingerprint(weather, articles):
+    """Hash of the scan inputs: weather bucket + the set of article URLs scored."""
+    urls = sorted(article_key(art) for art in articles)
+    payload = json.dumps([bucket_weather(weather), urls])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+# --- PIPELINE STAGES ---
+# Every stage takes the job dict for one asset, adds its output and returns it.
+# Returning None finishes the job early.
+
+def stage_weather(job):
+    asset = job['asset']
+    # Skip unconfigured assets
+    if not asset.get('lat'):
+        job['status'] = "skipped"
+        return None
+
+    print(f"   🔍 Scanning: {asset['name']}...")
+    job['weather'] = get_weather(asset['lat'], asset['lon'])
+    return job
+
+def stage_geocode(job):
+    asset = job['asset']
+    city = reverse_geocode(asset['lat'], asset['lon'])
+    job['city'] = city or asset['name'] # Fallback
+    return job
+
+def stage_news(jobs):
+    """
+    Batch stage: one planned set of NewsAPI queries for every city in the batch.
+    Each asset only gets the articles published since its own high-water mark.
+    """
+    starts = {}
+    for job in jobs:
+        job['previous'] = SCAN_STATE.get(asset_key(job['asset']))
+        mark = (job['previous'] or {}).get('news_mark')
+        starts.setdefault((NEWS_TOPIC, job['city'] or None), []).append(mark['published_at'] if mark else None)
+    # One asset without a mark means its whole city needs the full window
+    since = {key: None if None in values else min(values) for key, values in starts.items()}
+
+    responses = fetch_news_batch([(NEWS_TOPIC, job['city']) for job in jobs], since=since)
+    for job in jobs:
+        mark = (job['previous'] or {}).get('news_mark')
+        delta = new_articles(responses[(NEWS_TOPIC, job['city'] or None)], mark)
+        job['articles'] = dedupe(parse_news_risk(delta))
+        job['news_mark'] = advance_mark(mark, delta)
+    return jobs
+
+def stage_score(job):
+    asset = job['asset']
+    previous = job['previous']
+    # New articles first, then the ones already scored (newest-first either way)
+    fresh = {article_key(art) for art in job['articles']}
+    carried = [Article.from_dict(art) for art in (previous or {}).get('articles', []) if article_key(art) not in fresh]
+    articles = job['articles'] + carried
+    enhanced_articles = []
+    max_risk = 0
+    critical_threat = None
+    routed = {}  # id of another scanned asset -> its riskiest article among these
+
+    weather_bucket = bucket_weather(job['weather'])
+    fingerprint = scan_fingerprint(job['weather'], articles[:3])
+    if previous and previous['fingerprint'] == fingerprint:
+        print(f"      -> [{asset['name']}] Inputs unchanged since last scan. Skipping.")
+        job['status'] = "unchanged"
+        job['max_risk'] = previous['max_risk']
+        return None
+
+    # Old assessments are only valid if they were made under the same weather
+    known = previous['assessments'] if previous and previous['weather_bucket'] == weather_bucket else {}
+    assessments = {}
+    job['llm_calls'] = 0
+    job['llm_reused'] = 0
+
+    if articles:
+        print(f"      -> [{asset['name']}] Found {len(job['articles'])} new articles "
+              f"({len(carried)} already known). Analyzing Top 3...")
+        top = articles[:3] # Limit to 3 for speed
+        # Call AI for the new ones in one batch (once per story; copies seen by other assets share the result).
+        # Assets are scored concurrently across the stage's workers; each call is bounded by LLM_TIMEOUT_SECONDS.
+        new = [art for art in top if article_key(art) not in known]
+        assessed = assess_stories_parallel([(new, job['weather'], asset)], registry=job['registry'])[0]
+        scored = dict(zip(map(article_key, new), assessed))
+        job['llm_calls'] += len(new)
+        job['llm_reused'] += len(top) - len(new)
+
+        for art in top:
+            assessment = known.get(article_key(art)) or scored[article_key(art)]
+
+            art.update(assessment)
+            enhanced_articles.append(art)
+            assessments[article_key(art)] = {field: assessment.get(field) for field in ASSESSMENT_FIELDS}
+
+            target = assessment.get('target_asset')
+            if target != asset_id(asset) and target in job['scanned']:
+                if target not in routed or assessment['risk_score'] > routed[target]['risk_score']:
+                    routed[target] = art
+            elif assessment['risk_score'] > max_risk:
+                max_risk = assessment['risk_score']
+                critical_threat = art
+    else:
+        print(f"      -> [{asset['name']}] No news articles found.")
+
+    job['enhanced_articles'] = enhanced_articles
+    job['max_risk'] = max_risk
+    job['critical_threat'] = critical_threat
+    job['routed'] = routed
+    job['scan_state'] = {
+        "fingerprint": fingerprint,
+        "weather_bucket": weather_bucket,
+        "max_risk": max_risk,
+        "assessments": assessments,
+        "articles": [{field: art.get(field) for field in ARTICLE_FIELDS} for art in enhanced_articles],
+        "news_mark": job['news_mark'],
+    }
+    return job
+
+def stage_persist(job):
+    asset = job['asset']
+    if asset.get('id'):
+        save_analysis(
+            asset_id=asset['id'],
+            risk_topic="Automated Monitor",
+            weather_data=job['weather'],
+            articles=job['enhanced_articles'],
+            max_risk_score=job['max_risk']
+        )
+
+    # Remember this scan, unless the LLM failed (so the next scan retries it)
+    state = job['scan_state']
+    if not any(a['severity'] == "ERROR" for a in state['assessments'].values()):
+        SCAN_STATE.set(asset_key(asset), state)
+    return job
+
+def stage_alert(job):
+    asset = job['asset']
+    max_risk = job['max_risk']
+    critical_threat = job['critical_threat']
+    job['status'] = "ok"
+    job['alerted'] = False
+
+    print(f"      -> [{asset['name']}] Max Risk Score: {max_risk}/100 (Threshold: {RISK_THRESHOLD})")
+
+    if LEASES and not LEASES.still_owns(asset):
+        # Partition moved to another worker mid-scan; it will alert from there
+        print(f"   ↪️ [{asset['name']}] Lease handed off, skipping alert.")
+        return job
+
+    if max_risk > RISK_THRESHOLD and critical_threat and _first_alert(asset['name'], critical_threat):
+        print(f"   🚨 TRIGGERING ALERT for {asset['name']}...")
+        location = f"{job['city']} (Temp: {job['weather'].get('temp_c')}C)"
+        job['alerted'] = _send_alert(asset['name'], max_risk, location, critical_threat)
+    else:
+        print(f"   ✅ [{asset['name']}] No alerts triggered.")
+
+    # Threats found in this asset's news that target another asset in the scan
+    for target_id, art in job.get('routed', {}).items():
+        target = job['scanned'][target_id]
+        if art['risk_score'] <= RISK_THRESHOLD or (LEASES and not LEASES.still_owns(target)):
+            continue
+        if _first_alert(target['name'], art):
+            print(f"   🚨 TRIGGERING ALERT for {target['name']} (reported in news for {asset['name']})...")
+            if _send_alert(target['name'], art['risk_score'], art['impacted_asset'], art):
+                job['alerted'] = True
+
+    return job
+
+def _send_alert(asset_name, score, location, threat):
+    """Emails one alert and logs it; True if it was sent."""
+    risk_payload = {
+        "asset_name": asset_name,
+        "score": score,
+        "location": location,
+        "summary": threat.get('reasoning', 'No summary.'),
+        "action": threat.get('action', 'Check dashboard.')
+    }
+
+    # Send Email
+    sent = send_email_alert(ALERT_RECIPIENT, risk_payload)
+
+    if sent:
+        print(f"      ✅ [{asset_name}] Email Sent Successfully!")
+        # Log to DB
+        save_alert(
+            threat_id=None,
+            alert_type="email",
+            recipient=ALERT_RECIPIENT,
+            status="sent"
+        )
+    else:
+        print(f"      ❌ [{asset_name}] Email Failed to Send.")
+    return sent
+
+def _labelled(stage_func):
+    """Runs a stage with the job's asset set as the metrics 'asset' label."""
+    def run(job):
+        with metrics.asset_context(job['asset'].get('name')):
+            return stage_func(job)
+    return run
+
+def build_scan_pipeline():
+    """fetch -> geocode -> news -> score -> persist -> alert, linked by bounded queues."""
+    stages = [
+        Stage("weather", _labelled(stage_weather), STAGE_WORKERS["weather"]),
+        Stage("geocode", _labelled(stage_geocode), STAGE_WORKERS["geocode"]),
+        # Batched calls serve many assets, so they carry no per-asset metrics label
+        Stage("news", stage_news, STAGE_WORKERS["news"],
+              batch_size=NEWS_BATCH_SIZE, batch_wait=NEWS_BATCH_WAIT_SECONDS),
+        Stage("score", _labelled(stage_score), STAGE_WORKERS["score"]),
+        # Once an asset is scored its results are always saved and alerted on
+        Stage("persist", _labelled(stage_persist), STAGE_WORKERS["persist"], deferrable=False),
+        Stage("alert", _labelled(stage_alert), STAGE_WORKERS["alert"], deferrable=False),
+    ]
+    return Pipeline(stages, queue_size=STAGE_QUEUE_SIZE, report_every=PIPELINE_REPORT_SECONDS)
+
+def _owned_assets(assets):
+    """In sharded mode, keeps only the assets in partitions this worker leases."""
+    if not LEASES:
+        return assets
+    owned = LEASES.rebalance()
+    mine = [asset for asset in assets if LEASES.owns(asset)]
+    print(f"   🧩 Worker {LEASES.worker_id} holds {len(owned)}/{LEASES.partitions} partitions "
+          f"-> {len(mine)}/{len(assets)} assets.")
+    return mine
+
+def scan_priority(asset):
+    """Sort key: highest importance first, then highest risk at the last scan."""
+    previous = SCAN_STATE.get(asset_key(asset)) or {}
+    return (-(asset.get('importance') or 0), -(previous.get('max_risk') or 0))
+
+def run_sentinel_scan(assets=None, budget_minutes=None):
+    """
+    Scans assets through the staged pipeline, so weather, geocoding,
+    news, LLM scoring, DB writes and emails for different assets overlap.
+    With no assets given, does a full sweep of every asset in the database.
+    Assets run in scan_priority() order within the time budget
+    (default SCAN_BUDGET_MINUTES); the rest are reported as deferred.
+    Returns the scan stats dict (also printed), or None if nothing ran.
+    """
+    if not _scan_lock.acquire(blocking=False):
+        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] ⏭️ Previous scan still running, skipping this one.")
+        return None
+    try:
+        return _run_scan(assets, budget_minutes)
+    finally:
+        _scan_lock.release()
+
+def _llm_requests():
+    """LLM requests made by this process so far (single-article, batched and multi-asset)."""
+    return (metrics.call_count("openai_assess_news_risk")
+            + metrics.call_count("openai_assess_news_risk_batch")
+            + metrics.call_count("openai_assess_news_risk_multi"))
+
+def _prefilter_counts():
+    """(articles the relevance pre-filter kept from the LLM, articles it screened) so far."""
+    return (metrics.counter("sentinel_relevance_total", result="skipped"),
+            metrics.counter("sentinel_relevance_total"))
+
+def _run_scan(assets, budget_minutes):
     print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 🛰️ Starting Sentinel Scan...")
-    
+    scan_started = time.perf_counter()
+
     # 1. Fetch Assets
-    assets = get_all_assets()
-    if not assets:
-        print("   ⚠️ No assets found in database. Please run app.py and add assets first.")
-        return
+    if assets is None:
+        assets = get_all_assets()
+        if not assets:
+            print("   ⚠️ No assets found in database. Please run app.py and add assets first.")
+            return None
+        # Proximity covers every monitored asset, not just this worker's partitions
+        update_asset_registry(assets)
+        assets = _owned_assets(assets)
 
-    print(f"   📋 Monitoring {len(assets)} assets.")
+    assets = sorted(assets, key=scan_priority)
+    budget_minutes = SCAN_BUDGET_MINUTES if budget_minutes is None else budget_minutes
+    budget_note = f", budget {budget_minutes:g} min" if budget_minutes else ""
+    print(f"   📋 Monitoring {len(assets)} assets{budget_note}.")
 
-    for asset in assets:
-        try:
-            # Skip unconfigured assets
-            if not asset.get('lat'): 
-                continue
-            
-            print(f"   🔍 Scanning: {asset['name']}...")
-            
-            # 2. Fetch Data
-            w_raw = fetch_weather_coords(asset['lat'], asset['lon'])
-            w_clean = parse_weather_risk(w_raw)
-            
-            city = reverse_geocode(asset['lat'], asset['lon'])
-            if not city:
-                city = asset['name'] # Fallback
-            
-            # Fetch News
-            news_raw = fetch_news("logistics supply chain", location=city)
-            articles = parse_news_risk(news_raw)
-            
-            # 3. AI Analysis
-            enhanced_articles = []
-            max_risk = 0
-            critical_threat = None
-            
-            if articles:
-                print(f"      -> Found {len(articles)} articles. Analyzing Top 3...")
-                for art in articles[:3]: # Limit to 3 for speed
-                    ai_input = {"headline": art["Headline"], "summary": art.get("summary", art["Headline"])}
-                    
-                    # Call AI
-                    assessment = assess_news_risk(ai_input, weather_data=w_clean)
-                    art.update(assessment)
-                    enhanced_articles.append(art)
-                    
-                    if assessment['risk_score'] > max_risk:
-                        max_risk = assessment['risk_score']
-                        critical_threat = art
-            else:
-                print("      -> No news articles found.")
-
-            # 4. Save to DB
-            if asset.get('id'):
-                save_analysis(
-                    asset_id=asset['id'],
-                    risk_topic="Automated Monitor",
-                    weather_data=w_clean,
-                    articles=enhanced_articles,
-                    max_risk_score=max_risk
-                )
-            
-            # 5. ALERT LOGIC
-            print(f"      -> Max Risk Score: {max_risk}/100 (Threshold: {RISK_THRESHOLD})")
-            
-            if max_risk > RISK_THRESHOLD and critical_threat:
-                print(f"   🚨 TRIGGERING ALERT...")
-                
-                risk_payload = {
-                    "asset_name": asset['name'],
-                    "score": max_risk,
-                    "location": f"{city} (Temp: {w_clean.get('temp_c')}C)",
-                    "summary": critical_threat.get('reasoning', 'No summary.'),
-                    "action": critical_threat.get('action', 'Check dashboard.')
-                }
-                
-                # Send Email
-                sent = send_email_alert(ALERT_RECIPIENT, risk_payload)
-                
-                if sent:
-                    print("      ✅ Email Sent Successfully!")
-                    # Log to DB
-                    save_alert(
-                        threat_id=None,
-                        alert_type="email",
-                        recipient=ALERT_RECIPIENT,
-                        status="sent"
-                    )
-                else:
-                    print("      ❌ Email Failed to Send.")
-            else:
-                print(f"   ✅ No alerts triggered.")
-                
-        except Exception as e:
-            print(f"   ❌ Error scanning {asset.get('name')}: {e}")
+    _alerted.clear()
+    llm_before = _llm_requests()
+    fanout_before = metrics.counter("sentinel_story_fanout_total")
+    screened_before = _prefilter_counts()
+    pipeline = build_scan_pipeline()
+    # Every asset in the scan is scored against the same registry snapshot
+    registry = _scan_registry(assets)
+    scanned = {asset_id(asset): asset for asset in assets}
+    jobs = pipeline.run(({"asset": asset, "registry": registry, "scanned": scanned} for asset in assets),
+                        budget_seconds=budget_minutes * 60 if budget_minutes else None)
+
+    results = []
+    for job in jobs:
+        if job.get('error'):
+            print(f"   ❌ Error scanning {job['asset'].get('name')} ({job['failed_stage']}): {job['error']}")
+            status = "error"
+        else:
+            status = job.get('status', "ok")
+        results.append({
+            "asset": job['asset'].get('name'),
+            "status": status,
+            "error": job.get('error'),
+            "max_risk": job.get('max_risk'),
+            "alerted": job.get('alerted', False),
+            "llm_calls": job.get('llm_calls', 0),
+            "llm_reused": job.get('llm_reused', 0),
+            "seconds": job['seconds'],
+        })
 
+    stats = _scan_stats(results, time.perf_counter() - scan_started)
+    stats["llm_made"] = _llm_requests() - llm_before
+    stats["llm_shared"] = metrics.counter("sentinel_story_fanout_total") - fanout_before
+    stats["llm_cache"] = ASSESSMENT_CACHE.stats()
+    stats["prefilter_skipped"], stats["prefilter_total"] = (
+        after - before for after, before in zip(_prefilter_counts(), screened_before))
+    stats["stages"] = pipeline.stats()
+    stats["jobs"] = jobs
+    stats["covered"] = [r["asset"] for r in results if r["status"] != "deferred"]
+    stats["deferred"] = [r["asset"] for r in results if r["status"] == "deferred"]
+    stats["http"] = http_stats()
+    _print_scan_stats(stats)
+    pipeline.print_report()
     print(f"[{datetime.now().strftime('%H:%M:%S')}] 💤 Scan Complete.")
+    return stats
+
+def _scan_registry(assets):
+    """The current registry snapshot, or one of the given assets if it lacks any of them."""
+    registry = ASSETS.current()
+    located = [asset for asset in assets if asset.get('lat') is not None and asset.get('lon') is not None]
+    if all(asset_id(asset) in registry.by_id for asset in located):
+        return registry
+    return update_asset_registry(assets)
+
+def _scan_stats(results, wall_seconds):
+    """Summarises per-asset results into one scan report."""
+    timed = [r["seconds"] for r in results if r["status"] not in ("skipped", "deferred")]
+    return {
+        "assets": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "errors": [r for r in results if r["status"] == "error"],
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "unchanged": sum(1 for r in results if r["status"] == "unchanged"),
+        "llm_calls": sum(r.get("llm_calls", 0) for r in results),
+        "llm_reused": sum(r.get("llm_reused", 0) for r in results),
+        "alerts": sum(1 for r in results if r.get("alerted")),
+        "wall_seconds": wall_seconds,
+        "latency_avg": sum(timed) / len(timed) if timed else 0,
+        "latency_max": max(timed, default=0),
+        "assets_per_sec": len(timed) / wall_seconds if wall_seconds else 0,
+    }
+
+def _print_scan_stats(stats):
+    print(f"   📊 Scan Stats: {stats['ok']} ok, {len(stats['errors'])} errors, "
+          f"{stats['unchanged']} unchanged, {stats['skipped']} skipped, {stats['alerts']} alerts")
+    if stats["deferred"]:
+        print(f"      -> Budget spent: covered {len(stats['covered'])}, deferred {len(stats['deferred'])} "
+              f"(e.g. {', '.join(str(name) for name in stats['deferred'][:5])}"
+              f"{' ...' if len(stats['deferred']) > 5 else ''})")
+    print(f"      -> LLM: {stats['llm_calls']} articles scored in {stats['llm_made']} requests "
+          f"({stats['llm_shared']} shared with other copies of a story), "
+          f"{stats['llm_reused']} reused from last scan")
+    if stats.get("prefilter_total"):
+        print(f"      -> Pre-filter: {stats['prefilter_skipped']} of {stats['prefilter_total']} articles "
+              f"({stats['prefilter_skipped'] / stats['prefilter_total']:.0%}) skipped the LLM")
+    llm_cache = stats.get("llm_cache")
+    if llm_cache:
+        print(f"      -> LLM cache since start: {llm_cache['hits']} hits, {llm_cache['misses']} misses "
+              f"({llm_cache['hit_rate']:.0%} hit rate)")
+    http = stats.get("http") or {}
+    if http:
+        requests_made = sum(h["requests"] for h in http.values())
+        connections = sum(h["connections"] for h in http.values())
+        print(f"      -> HTTP since start: {requests_made} requests over {connections} connections "
+              f"({requests_made - connections} handshakes saved)")
+    print(f"      -> Wall clock: {stats['wall_seconds']:.1f}s "
+          f"(per-asset latency avg {stats['latency_avg']:.1f}s, "
+          f"max {stats['latency_max']:.1f}s, "
+          f"{stats['assets_per_sec']:.2f} assets/s)")
+
+def run_adaptive_monitor():
+    """
+    Main loop: keeps a ScanScheduler in sync with the asset list and scans
+    whichever assets are due, then reschedules each from its result.
+    """
+    scan_scheduler = ScanScheduler()
+    last_refresh = 0
+
+    while True:
+        try:
+            if time.time() - last_refresh >= ASSET_REFRESH_MINUTES * 60:
+                assets = get_all_assets()
+                if assets:  # An empty list is usually a DB hiccup; keep the current schedule
+                    update_asset_registry(assets)
+                    scan_scheduler.sync(_owned_assets(assets))
+                last_refresh = time.time()
+
+            due = scan_scheduler.pop_due()
+            if due:
+                stats = run_sentinel_scan(due)
+                # A skipped scan (another one still running) hands everything back
+                jobs = stats["jobs"] if stats else [{"asset": asset, "status": "deferred"} for asset in due]
+                for job in jobs:
+                    if job.get('status') == "deferred":
+                        scan_scheduler.defer(job['asset'])
+                    elif job.get('error'):
+                        scan_scheduler.retry_soon(job['asset'])
+                    else:
+                        scan_scheduler.record(job['asset'], job.get('max_risk'), job.get('weather'))
+                next_in = scan_scheduler.next_due_in()
+                if stats and next_in is not None:
+                    print(f"   ⏱️ {len(scan_scheduler)} assets scheduled, next due in {next_in / 60:.1f} min.")
+
+            time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n🛑 Monitor Stopped.")
+            if LEASES:
+                LEASES.release_all()
+            break
 
 if __name__ == "__main__":
     load_dotenv()
@@ -129,16 +535,17 @@ if __name__ == "__main__":
         print("❌ ERROR: Please set ALERT_RECIPIENT in .env or at top of monitor.py")
         sys.exit()
 
-    # Run once immediately
-    run_sentinel_scan()
-    
-    # Schedule
-    schedule.every(CHECK_INTERVAL_MINUTES).minutes.do(run_sentinel_scan)
-    
-    while True:
-        try:
-            schedule.run_pending()
-            time.sleep(1)
-        except KeyboardInterrupt:
-            print("\n🛑 Monitor Stopped.")
-            break
\ No newline at end of file
+    if os.getenv("SENTINEL_SHARDED") == "1" or "--sharded" in sys.argv:
+        LEASES = LeaseManager()
+        LEASES.start_heartbeat()
+        print(f"   Sharded Mode: worker {LEASES.worker_id}")
+
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+        print(f"   Metrics: http://0.0.0.0:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        metrics.start_file_writer(METRICS_FILE)
+        print(f"   Metrics File: {METRICS_FILE}")
+
+    # Per-asset adaptive schedule (every asset gets a first scan within the min interval)
+    run_adaptive_monitor()
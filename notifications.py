@@ -3,16 +3,19 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 from dotenv import load_dotenv
+from metrics import instrumented
 
 load_dotenv()
 
 # CONFIGURATION
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
 # Make sure these are in your .env file
 SENDER_EMAIL = os.getenv("EMAIL_USER")
 SENDER_PASSWORD = os.getenv("EMAIL_PASS")
 
+@instrumented("send_email_alert")
 def send_email_alert(recipient_email, risk_data):
     """
     Sends a styled HTML email alert.
@@ -79,7 +82,8 @@ def send_email_alert(recipient_email, risk_data):
 
         # 3. Connect & Send
         server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
+        if SMTP_STARTTLS:
+            server.starttls()
         server.login(SENDER_EMAIL, SENDER_PASSWORD)
         server.sendmail(SENDER_EMAIL, recipient_email, msg.as_string())
         server.quit()
@@ -0,0 +1,232 @@
+import time
+import queue
+import threading
+
+# --- STAGED PIPELINE ---
+# Jobs (plain dicts) flow through a chain of stages. Each stage has its own
+# worker threads and reads from a bounded queue, so a slow stage fills its
+# queue and blocks the stage before it (backpressure) instead of piling up work.
+
+_STOP = object()
+
+class Stage:
+    """
+    One step of the pipeline. func(job) returns the job to pass on, or None to finish it early.
+    deferrable=False stages (e.g. saving results) still run after the pipeline's budget is spent.
+    With batch_size > 1, func(jobs) gets up to batch_size jobs at once (waiting at most
+    batch_wait seconds to fill the batch) and returns one result per job, in order.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=None, deferrable=True,
+                 batch_size=1, batch_wait=0.0):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.deferrable = deferrable
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.queue = None
+
+        # Counters (guarded by _lock)
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.deferred = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._alive = 0
+
+    def _record(self, seconds, failed, count=1):
+        with self._lock:
+            self.processed += count
+            self.busy_seconds += seconds
+            if failed:
+                self.errors += count
+
+    def _note_depth(self):
+        depth = self.queue.qsize()
+        with self._lock:
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    def stats(self, wall_seconds):
+        with self._lock:
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "deferred": self.deferred,
+                "queue_depth": self.queue.qsize() if self.queue else 0,
+                "max_queue_depth": self.max_depth,
+                "busy_seconds": self.busy_seconds,
+                "throughput_per_sec": self.processed / wall_seconds if wall_seconds else 0,
+            }
+
+class Pipeline:
+    """
+    Runs jobs through stages in order. A stage that raises marks the job with
+    'error' / 'failed_stage' and sends it straight to the output, so one bad
+    job never stops the others.
+    """
+
+    def __init__(self, stages, queue_size=32, report_every=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.report_every = report_every
+        self.started = None
+        self.deadline = None
+
+    def run(self, jobs, budget_seconds=None):
+        """
+        Feeds jobs in, blocks until every job is out, returns the finished jobs.
+        With a budget, jobs not yet admitted when it runs out (and jobs waiting for a
+        deferrable stage) come back with status 'deferred' instead of being run.
+        """
+        self.started = time.perf_counter()
+        self.deadline = self.started + budget_seconds if budget_seconds else None
+        output = queue.Queue()
+
+        for stage in self.stages:
+            stage.queue = queue.Queue(maxsize=stage.queue_size or self.queue_size)
+            stage._alive = stage.workers
+
+        threads = []
+        for idx, stage in enumerate(self.stages):
+            downstream = self.stages[idx + 1] if idx + 1 < len(self.stages) else None
+            for n in range(stage.workers):
+                t = threading.Thread(
+                    target=self._work, args=(stage, downstream, output),
+                    name=f"pipeline-{stage.name}-{n}", daemon=True
+                )
+                t.start()
+                threads.append(t)
+
+        feeder = threading.Thread(target=self._feed, args=(jobs, output), name="pipeline-feed", daemon=True)
+        feeder.start()
+
+        finished = []
+        while True:
+            try:
+                job = output.get(timeout=self.report_every)
+            except queue.Empty:
+                self.print_report()
+                continue
+            if job is _STOP:
+                break
+            finished.append(job)
+
+        feeder.join()
+        for t in threads:
+            t.join()
+        return finished
+
+    def _out_of_time(self):
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def _defer(self, job, output):
+        job["status"] = "deferred"
+        job.setdefault("_enqueued_at", time.perf_counter())
+        job["seconds"] = time.perf_counter() - job["_enqueued_at"]
+        output.put(job)
+
+    def _feed(self, jobs, output):
+        first = self.stages[0]
+        for job in jobs:
+            job.setdefault("_enqueued_at", time.perf_counter())
+            while True:
+                if self._out_of_time():
+                    self._defer(job, output)
+                    break
+                try:
+                    # Blocks while the first stage is saturated, re-checking the budget
+                    first.queue.put(job, timeout=0.5)
+                    first._note_depth()
+                    break
+                except queue.Full:
+                    continue
+        for _ in range(first.workers):
+            first.queue.put(_STOP)
+
+    def _take(self, stage):
+        """Next batch of jobs from the stage's queue; the bool is True once _STOP was seen."""
+        job = stage.queue.get()
+        if job is _STOP:
+            return [], True
+        batch = [job]
+        wait_until = time.perf_counter() + stage.batch_wait
+        while len(batch) < stage.batch_size:
+            remaining = wait_until - time.perf_counter()
+            try:
+                job = stage.queue.get(timeout=remaining) if remaining > 0 else stage.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _pass_on(self, job, result, failed, downstream, output):
+        if failed or result is None or downstream is None:
+            finished = result if result is not None else job
+            finished["seconds"] = time.perf_counter() - finished["_enqueued_at"]
+            output.put(finished)
+        else:
+            downstream.queue.put(result)  # Blocks while the next stage is saturated
+            downstream._note_depth()
+
+    def _work(self, stage, downstream, output):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._take(stage)
+
+            if batch and stage.deferrable and self._out_of_time():
+                with stage._lock:
+                    stage.deferred += len(batch)
+                for job in batch:
+                    self._defer(job, output)
+                continue
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                if stage.batch_size > 1:
+                    results = stage.func(batch)
+                else:
+                    results = [stage.func(batch[0])]
+            except Exception as e:
+                failed = True
+                for job in batch:
+                    job["error"] = str(e)
+                    job["failed_stage"] = stage.name
+                results = [None] * len(batch)
+            stage._record(time.perf_counter() - started, failed, len(batch))
+
+            for job, result in zip(batch, results):
+                self._pass_on(job, result, failed, downstream, output)
+
+        # Last worker out closes the next stage (or the output)
+        with stage._lock:
+            stage._alive -= 1
+            last = stage._alive == 0
+        if last:
+            if downstream is None:
+                output.put(_STOP)
+            else:
+                for _ in range(downstream.workers):
+                    downstream.queue.put(_STOP)
+
+    def stats(self):
+        wall = time.perf_counter() - self.started if self.started else 0
+        return [stage.stats(wall) for stage in self.stages]
+
+    def print_report(self):
+        for s in self.stats():
+            print(f"      -> [{s['stage']:<8}] done {s['processed']:>5} | err {s['errors']:>3} | "
+                  f"deferred {s['deferred']:>3} | "
+                  f"queue {s['queue_depth']:>3} (max {s['max_queue_depth']:>3}) | "
+                  f"busy {s['busy_seconds']:7.1f}s | {s['throughput_per_sec']:6.2f}/s | "
+                  f"{s['workers']} workers")
@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from metrics import inc, observe
+from replay import replaying
+
+# --- PROVIDER RATE LIMITS ---
+# Every external call takes a token from its provider's bucket first, so
+# concurrent scans queue up here instead of collecting 429s. Limits are in
+# requests per second (0 = unlimited) with a burst allowance:
+#
+#   RATELIMIT_NOMINATIM=1  RATELIMIT_NOMINATIM_BURST=1
+#
+# By default each process has its own buckets. Set SENTINEL_RATELIMIT_DB to a
+# SQLite path to share one budget between the dashboard and monitor.py.
+# Replayed runs (replay.py) never touch the network, so they are not limited.
+#
+#   sentinel_ratelimit_acquired_total{provider}       tokens taken
+#   sentinel_ratelimit_wait_seconds_total{provider}   time spent queueing
+#   sentinel_call_duration_seconds{stage="ratelimit_<provider>"}  wait histogram
+
+DEFAULT_LIMITS = {
+    # provider: (requests/second, burst)
+    "openweather": (1.0, 10),   # Free tier: 60 calls/minute
+    "newsapi": (0.5, 5),
+    "nominatim": (1.0, 1),      # Usage policy: absolute max 1 request/second
+    "openai": (8.0, 10),        # ~500 RPM
+}
+
+RATELIMIT_DB_PATH = os.getenv("SENTINEL_RATELIMIT_DB")
+
+def _limit(provider):
+    rate, burst = DEFAULT_LIMITS.get(provider, (0, 1))
+    rate = float(os.getenv(f"RATELIMIT_{provider.upper()}", rate))
+    burst = float(os.getenv(f"RATELIMIT_{provider.upper()}_BURST", burst))
+    return rate, max(1.0, burst)
+
+class TokenBucket:
+    """In-process bucket: refills at rate tokens/second up to burst."""
+
+    def __init__(self, provider, rate, burst):
+        self.provider = provider
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self):
+        """Takes a token, or returns the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a token is free; returns the seconds spent waiting."""
+        started = time.perf_counter()
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return time.perf_counter() - started
+            time.sleep(wait)
+
+class SharedTokenBucket(TokenBucket):
+    """Same bucket, with its state in SQLite so every process draws from one budget."""
+
+    def __init__(self, provider, rate, burst, db_path):
+        super().__init__(provider, rate, burst)
+        self.db_path = db_path
+        conn = self._connect()
+        try:
+            conn.execute("""CREATE TABLE IF NOT EXISTS buckets (
+                provider TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL)""")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _try_take(self):
+        # Wall clock, not monotonic: the timestamp is compared across processes
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE provider = ?",
+                               (self.provider,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO buckets (provider, tokens, updated_at) VALUES (?, ?, ?)",
+                         (self.provider, tokens, now))
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def bucket(provider):
+    """The provider's bucket (None when unlimited)."""
+    with _buckets_lock:
+        if provider not in _buckets:
+            rate, burst = _limit(provider)
+            if rate <= 0:
+                _buckets[provider] = None
+            elif RATELIMIT_DB_PATH:
+                _buckets[provider] = SharedTokenBucket(provider, rate, burst, RATELIMIT_DB_PATH)
+            else:
+                _buckets[provider] = TokenBucket(provider, rate, burst)
+        return _buckets[provider]
+
+def acquire(provider):
+    """Waits for the provider's next token and records the wait."""
+    limiter = bucket(provider)
+    if limiter is None or replaying():
+        return 0.0
+    waited = limiter.acquire()
+    inc("sentinel_ratelimit_acquired_total", provider=provider)
+    inc("sentinel_ratelimit_wait_seconds_total", waited, provider=provider)
+    observe(f"ratelimit_{provider}", waited, "ok")
+    return waited
+
+def rate_limited(provider):
+    """Decorator: acquire(provider) before every call (outside any timing decorator below it)."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            acquire(provider)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
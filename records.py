@@ -0,0 +1,111 @@
+from dataclasses import dataclass, fields, replace
+
+# --- TYPED RECORDS ---
+# Articles and weather readings are the bulk of a scan's memory. They used to be
+# plain dicts (one hash table each); these slotted dataclasses store the same
+# values in fixed slots, roughly a third of the size.
+#
+# They still read like the dicts they replace (record['Headline'], .get(),
+# .update(), dict(record)), so parsers, risk_engine, database and the UI all use
+# them unchanged. A field set to None counts as missing, like an absent key.
+
+class _Record:
+    __slots__ = ()
+
+    @classmethod
+    def field_names(cls):
+        return [f.name for f in fields(cls)]
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a record from a dict, ignoring keys that aren't fields."""
+        names = cls._names()
+        return cls(**{k: v for k, v in data.items() if k in names})
+
+    @classmethod
+    def _names(cls):
+        names = cls.__dict__.get("_field_set")
+        if names is None:
+            names = frozenset(cls.field_names())
+            setattr(cls, "_field_set", names)
+        return names
+
+    def __getitem__(self, key):
+        if key not in self._names():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._names():
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._names() and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self._names() else None
+        return default if value is None else value
+
+    def keys(self):
+        return [name for name in self.field_names() if getattr(self, name) is not None]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def update(self, other=(), **kwargs):
+        """dict.update(); keys that aren't fields are ignored."""
+        pairs = other.items() if hasattr(other, "items") else other
+        for key, value in list(pairs) + list(kwargs.items()):
+            if key in self._names():
+                setattr(self, key, value)
+
+    def copy(self):
+        return replace(self)
+
+    def to_dict(self):
+        return dict(self.items())
+
+@dataclass(slots=True)
+class Article(_Record):
+    """A parsed news article, plus its risk assessment once scored (keys as in parse_news_risk)."""
+    Headline: str
+    Source: str = None
+    Published: str = ""
+    URL: str = None
+    summary: str = None
+    story_id: str = None
+    # Filled in by risk_engine
+    risk_score: int = None
+    severity: str = None
+    reasoning: str = None
+    action: str = None
+    estimated_impact_radius: int = None
+    impacted_asset: str = None
+    target_asset: str = None
+
+    @classmethod
+    def from_threat(cls, row):
+        """Rebuilds a scored article from a 'threats' table row."""
+        return cls(
+            Headline=row['headline'],
+            Source=row['source'],
+            Published=row['published_date'],
+            URL=row['url'],
+            risk_score=row['risk_score'],
+            severity=row['severity'],
+            reasoning=row['reasoning'],
+            action=row['action'],
+            impacted_asset=row['impacted_asset'],
+        )
+
+@dataclass(slots=True)
+class Weather(_Record):
+    """A parsed OpenWeather reading (keys as in parse_weather_risk)."""
+    location: str
+    lat: float
+    lon: float
+    temp_c: float
+    condition: str
+    wind_speed_ms: float
+    visibility_km: float
@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+from geo import RadiusIndex
+
+# --- ASSET REGISTRY SNAPSHOTS ---
+# Proximity checks read the whole asset set. A RegistrySnapshot is one frozen
+# version of it: read-only assets, a lookup by asset id and the spatial index,
+# built once per distinct asset set. Snapshots never change, so any number of
+# threads and scans share one without copying or locking.
+#
+# AssetRegistry holds the current snapshot. publish() swaps in a new one with a
+# single reference assignment; a scan that took a snapshot keeps scoring against
+# it while another session publishes a different set. Recently published
+# versions are kept, so sessions alternating between two sets don't rebuild.
+
+REGISTRY_FIELDS = ("name", "type", "lat", "lon", "importance", "radius")
+SNAPSHOTS_KEPT = 8
+
+def asset_id(asset):
+    """The asset's database id, else an id derived from its name and position (not its place in a list)."""
+    if asset.get('id') is not None:
+        return str(asset['id'])
+    digest = hashlib.sha1(f"{asset['name']}|{asset['lat']:.5f}|{asset['lon']:.5f}".encode("utf-8")).hexdigest()
+    return f"ASSET-{digest[:10]}"
+
+def _rows(assets):
+    """Registry entries for the assets that have a position (others can't be near anything)."""
+    return [{"id": asset_id(asset), **{field: asset[field] for field in REGISTRY_FIELDS}}
+            for asset in assets if asset.get('lat') is not None and asset.get('lon') is not None]
+
+def registry_version(rows):
+    # Rows always have the same keys in the same order, so their values identify the set
+    payload = repr([tuple(row.values()) for row in rows])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+class RegistrySnapshot:
+    """One immutable, indexed version of the asset set."""
+    __slots__ = ("version", "assets", "by_id", "index")
+
+    def __init__(self, rows, version):
+        frozen = tuple(MappingProxyType(row) for row in rows)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "assets", frozen)
+        object.__setattr__(self, "by_id", MappingProxyType({asset['id']: asset for asset in frozen}))
+        object.__setattr__(self, "index", RadiusIndex([a['lat'] for a in frozen], [a['lon'] for a in frozen],
+                                                      [a['radius'] for a in frozen]))
+
+    @classmethod
+    def from_assets(cls, assets):
+        rows = _rows(assets)
+        return cls(rows, registry_version(rows))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RegistrySnapshot is immutable; publish a new asset set instead")
+
+    def __len__(self):
+        return len(self.assets)
+
+    def near(self, lat, lon, slack_km=0.0):
+        """(asset, distance in km) for each asset whose radius (+ slack_km) covers (lat, lon), in registry order."""
+        return [(self.assets[i], float(distance)) for i, distance in zip(*self.index.within(lat, lon, slack_km))]
+
+class AssetRegistry:
+    """The current RegistrySnapshot, replaced atomically by publish()."""
+
+    def __init__(self, assets=()):
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()  # version -> snapshot
+        self._current = self._snapshot_for(assets)
+
+    def current(self):
+        return self._current
+
+    def publish(self, assets):
+        """Makes the asset set current and returns its snapshot (reused if this version was built recently)."""
+        snapshot = self._snapshot_for(assets)
+        self._current = snapshot
+        return snapshot
+
+    def _snapshot_for(self, assets):
+        rows = _rows(assets)
+        version = registry_version(rows)
+        with self._lock:
+            snapshot = self._recent.get(version)
+            if snapshot is not None:
+                self._recent.move_to_end(version)
+                return snapshot
+        # Built outside the lock; two threads racing on a new version both get a correct snapshot
+        snapshot = RegistrySnapshot(rows, version)
+        with self._lock:
+            self._recent[version] = snapshot
+            while len(self._recent) > SNAPSHOTS_KEPT:
+                self._recent.popitem(last=False)
+        return snapshot
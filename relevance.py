@@ -0,0 +1,85 @@
+import os
+import re
+import math
+
+from metrics import inc
+
+# --- RELEVANCE PRE-FILTER ---
+# Most articles matched by "logistics supply chain AND <city>" are market,
+# earnings or corporate news with no physical or operational risk in them.
+# A linear model over a small lexicon scores headline + summary in microseconds;
+# only articles scoring at least RELEVANCE_THRESHOLD (0-1) go on to the LLM.
+# The rest get a provisional LOW assessment without an LLM call.
+#
+# The lexicon can't know every hazard, so the model only skips what it
+# recognises as market news: risk terms only ever raise the score, and an
+# article falls below the threshold only when market/corporate terms clearly
+# outweigh the risk terms in it.
+#
+#   RELEVANCE_THRESHOLD=0    send every article to the LLM
+#   sentinel_relevance_total{result="llm"|"skipped"}
+#
+# Scores are logistic: a text with no lexicon terms scores 0.5 (it goes to the
+# LLM), one strong risk term (fire, flood, strike...) ~0.9, an earnings story
+# ~0.1; "fire ... shares fall" stays above the threshold.
+
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.3"))
+RELEVANCE_BIAS = 0.0
+
+# Word (or word pair) -> weight. Each term counts once per article.
+RELEVANCE_WEIGHTS = {
+    # Physical events
+    "fire": 2.5, "fires": 2.5, "blaze": 2.5, "explosion": 3.0, "blast": 2.5, "collapse": 2.0,
+    "flood": 2.5, "floods": 2.5, "flooding": 2.5, "cyclone": 3.0, "storm": 2.0, "landslide": 2.5,
+    "earthquake": 3.0, "heatwave": 1.5, "heat wave": 1.5, "drought": 1.0, "leak": 1.5, "spill": 1.5,
+    "hurricane": 3.0, "typhoon": 3.0, "tornado": 3.0, "tsunami": 3.0, "wildfire": 3.0, "wildfires": 3.0,
+    "storms": 2.0, "cyclonic": 2.5, "cloudburst": 3.0, "avalanche": 2.5, "eruption": 2.5, "volcano": 2.0,
+    "rain": 1.5, "rains": 1.5, "rainfall": 1.5, "downpour": 2.0, "monsoon": 1.0, "waterlogging": 2.5,
+    "waterlogged": 2.5, "inundated": 2.5, "submerged": 2.0, "snowstorm": 2.5, "blizzard": 2.5, "fog": 1.0,
+    "capsized": 2.5, "sank": 2.0, "grounded": 1.5, "piracy": 2.5, "hijacked": 2.5,
+    "accident": 1.5, "collision": 1.5, "crash": 1.5, "derailment": 2.5, "derailed": 2.5,
+    # Unrest and security
+    "strike": 2.0, "strikes": 2.0, "protest": 2.0, "protests": 2.0, "riot": 3.0, "riots": 3.0,
+    "curfew": 3.0, "bandh": 3.0, "blockade": 2.5, "violence": 2.5, "attack": 2.5, "bomb": 3.0,
+    "terror": 3.0, "theft": 1.5, "looting": 2.5, "evacuated": 2.5, "evacuation": 2.5,
+    "cyberattack": 2.5, "ransomware": 2.5, "walkout": 2.0, "stoppage": 2.0, "lockout": 2.0, "hartal": 3.0,
+    "agitation": 2.0, "unrest": 2.5, "clashes": 2.5, "shooting": 2.5, "sabotage": 2.5,
+    # Operational disruption
+    "closes": 1.5, "closed": 1.5, "closure": 1.5, "shut": 1.5, "shutdown": 2.0, "halted": 1.5,
+    "suspended": 1.5, "outage": 2.0, "disrupts": 1.5, "disrupted": 1.5, "disruption": 1.5,
+    "congestion": 1.5, "delays": 1.0, "delayed": 1.0, "stranded": 1.5, "embargo": 1.5,
+    "shortage": 1.0, "port congestion": 1.0, "power cut": 2.0,
+    # Market and corporate news
+    "earnings": -2.5, "quarterly": -1.5, "profit": -1.5, "revenue": -1.5, "shares": -1.5,
+    "stock": -1.5, "stocks": -1.5, "investors": -1.5, "ipo": -2.0, "dividend": -2.0,
+    "valuation": -1.5, "funding": -1.5, "acquisition": -1.5, "acquires": -1.5, "merger": -1.5,
+    "analysts": -1.0, "estimates": -1.0, "opens": -1.0, "launches": -1.0, "partnership": -1.0,
+    "appoints": -1.5, "ceo": -1.0, "award": -1.5, "expansion": -1.0,
+}
+
+def relevance(headline, summary=None):
+    """0-1 likelihood that the text describes a physical or operational risk."""
+    words = re.findall(r"[a-z0-9]+", f"{headline or ''} {summary or ''}".lower())
+    terms = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    logit = RELEVANCE_BIAS + sum(RELEVANCE_WEIGHTS.get(term, 0.0) for term in terms)
+    return 1 / (1 + math.exp(-logit))
+
+def screen(article_input):
+    """
+    None if the article ({'headline', 'summary'}) should go to the LLM, else a
+    provisional assessment (RiskAssessment fields) for it.
+    """
+    score = relevance(article_input.get('headline'), article_input.get('summary'))
+    if score >= RELEVANCE_THRESHOLD:
+        inc("sentinel_relevance_total", result="llm")
+        return None
+    inc("sentinel_relevance_total", result="skipped")
+    return {
+        # Stays below the 20 points where the asset importance multiplier applies
+        "risk_score": round(score * 20),
+        "severity": "LOW",
+        "reasoning": f"Screened out by the relevance pre-filter (relevance {score:.2f}): "
+                     "no physical or operational risk terms.",
+        "action": "No action needed",
+        "estimated_impact_radius": 0,
+    }
@@ -0,0 +1,139 @@
+import os
+import json
+import asyncio
+import inspect
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from functools import wraps
+
+# --- RECORD / REPLAY ---
+# Deterministic, network-free runs for profiling and regression checks.
+#
+#   SENTINEL_REPLAY_MODE=record python monitor.py   # real providers, responses archived
+#   SENTINEL_REPLAY_MODE=replay python monitor.py   # same inputs, no provider traffic
+#
+# Covered calls: OpenWeather, Nominatim, NewsAPI and the OpenAI assessment
+# (Supabase and SMTP stay live). Each response is stored once per distinct
+# request as zlib-compressed JSON in a single SQLite archive, together with how
+# long the real call took. In replay mode SENTINEL_REPLAY_LATENCY simulates the
+# provider: "recorded" sleeps for the recorded duration, a number sleeps that
+# many ms, 0 (default) returns at once. Rate limits are off while replaying.
+# Batched news is also archived per (topic, location), because how locations get
+# grouped into queries depends on timing and would not repeat exactly.
+
+REPLAY_MODE = os.getenv("SENTINEL_REPLAY_MODE", "off").lower()
+REPLAY_ARCHIVE = os.getenv("SENTINEL_REPLAY_ARCHIVE", "sentinel_replay.db")
+REPLAY_LATENCY = os.getenv("SENTINEL_REPLAY_LATENCY", "0")
+
+class ReplayMiss(LookupError):
+    """A replayed run made a request that was never recorded."""
+
+_conn = None
+_conn_lock = threading.Lock()
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(REPLAY_ARCHIVE, timeout=30, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            provider TEXT NOT NULL,
+            request_key TEXT NOT NULL,
+            response BLOB NOT NULL,
+            seconds REAL NOT NULL,
+            PRIMARY KEY (provider, request_key))""")
+    return _conn
+
+def replaying():
+    return REPLAY_MODE == "replay"
+
+def recording():
+    return REPLAY_MODE == "record"
+
+def request_key(*args, **kwargs):
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def record(provider, key, response, seconds):
+    blob = zlib.compress(json.dumps(response).encode("utf-8"), 6)
+    with _conn_lock:
+        _db().execute("INSERT OR REPLACE INTO responses (provider, request_key, response, seconds) VALUES (?, ?, ?, ?)",
+                      (provider, key, blob, seconds))
+
+def lookup(provider, key):
+    """(response, recorded seconds); raises ReplayMiss if the request was never recorded."""
+    with _conn_lock:
+        row = _db().execute("SELECT response, seconds FROM responses WHERE provider = ? AND request_key = ?",
+                            (provider, key)).fetchone()
+    if row is None:
+        raise ReplayMiss(f"No recorded {provider} response for this request")
+    return json.loads(zlib.decompress(row[0])), row[1]
+
+def _simulate_latency(recorded_seconds):
+    if REPLAY_LATENCY == "recorded":
+        time.sleep(recorded_seconds)
+    elif float(REPLAY_LATENCY) > 0:
+        time.sleep(float(REPLAY_LATENCY) / 1000)
+
+def replayed(provider, key, miss_as_error=False):
+    """Replay-mode lookup with simulated latency (for callers that record() themselves)."""
+    try:
+        response, seconds = lookup(provider, key)
+    except ReplayMiss as e:
+        if miss_as_error:
+            return {"error": str(e)}
+        raise
+    _simulate_latency(seconds)
+    return response
+
+def replayable(provider, miss_as_error=False, name=None):
+    """
+    Decorator for a provider call whose arguments identify the request and whose
+    result is JSON-serialisable. miss_as_error=True returns {'error': ...} on a
+    replay miss (for functions that report errors that way) instead of raising.
+    Works on coroutine functions too; name lets an async variant share the sync
+    function's recordings.
+    """
+    def decorator(func):
+        call_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if REPLAY_MODE not in ("record", "replay"):
+                    return await func(*args, **kwargs)
+
+                key = request_key(call_name, *args, **kwargs)
+                if REPLAY_MODE == "replay":
+                    return await asyncio.to_thread(replayed, provider, key, miss_as_error)
+
+                started = time.perf_counter()
+                response = await func(*args, **kwargs)
+                record(provider, key, response, time.perf_counter() - started)
+                return response
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if REPLAY_MODE not in ("record", "replay"):
+                return func(*args, **kwargs)
+
+            key = request_key(call_name, *args, **kwargs)
+            if REPLAY_MODE == "replay":
+                return replayed(provider, key, miss_as_error)
+
+            started = time.perf_counter()
+            response = func(*args, **kwargs)
+            record(provider, key, response, time.perf_counter() - started)
+            return response
+        return wrapper
+    return decorator
+
+def stats():
+    """{provider: (responses, compressed bytes)} for the archive."""
+    with _conn_lock:
+        rows = _db().execute("SELECT provider, COUNT(*), SUM(LENGTH(response)) FROM responses GROUP BY provider").fetchall()
+    return {provider: (count, size) for provider, count, size in rows}
@@ -1,17 +1,45 @@
 import os
+import json
+import queue
+import atexit
 import math
+import hashlib
+import asyncio
+import contextvars
+import threading
+import concurrent.futures
 import instructor
-from openai import OpenAI
-from pydantic import BaseModel, Field
+from openai import AsyncOpenAI
+from functools import lru_cache
+from pydantic import BaseModel, Field, ValidationError, conlist, create_model
 from dotenv import load_dotenv
+from metrics import track, inc
+from cache import PersistentCache
+from dedup import DEDUP_WINDOW_HOURS
+from ingestion import bucket_weather
+from ratelimit import acquire
+from replay import replayable, ReplayMiss
+from relevance import screen
+from registry import AssetRegistry, asset_id
+from gazetteer import locate_event
 
 load_dotenv()
 
 # 1. SETUP OPENAI CLIENT
-client = instructor.patch(OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+# Every call goes through an instructor-patched AsyncOpenAI client, set for the
+# duration of a scoring run (section 9).
+_async_client = contextvars.ContextVar("async_client")
 
-# 2. THE ASSET REGISTRY (Dynamic - can be updated)
+def _new_async_client():
+    return instructor.patch(AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+
+# Built once here so the SDK's lazily imported HTTP stack (~700 modules) loads at
+# import, not inside the first scan
+_new_async_client()
+
+# 2. THE ASSET REGISTRY (Dynamic - can be updated, see registry.py)
 # In a real app, this would come from a database (PostgreSQL).
+# These are the defaults until update_asset_registry() publishes another set.
 # 'importance': 1 (Low) to 10 (Critical HQ). 
 # 'radius': How close an event must be to matter (in km).
 ASSET_REGISTRY = [
@@ -53,27 +81,20 @@ ASSET_REGISTRY = [
     }
 ]
 
+# The live registry: an immutable snapshot of ASSET_REGISTRY (or the last published set)
+ASSETS = AssetRegistry(ASSET_REGISTRY)
+
 def update_asset_registry(assets_list):
     """
-    Updates the global ASSET_REGISTRY with user-provided assets.
+    Publishes user-provided assets as the current registry snapshot and returns it.
+    Pass the snapshot to the assess_* functions, so concurrent sessions each score
+    against their own asset set.
     This function will be replaced with database calls in production.
     
     Args:
-        assets_list: List of dictionaries with keys: name, type, lat, lon, importance, radius
-    """
-    global ASSET_REGISTRY
-    ASSET_REGISTRY = []
-    
-    for idx, asset in enumerate(assets_list):
-        ASSET_REGISTRY.append({
-            "id": f"ASSET-{idx+1:03d}",
-            "name": asset['name'],
-            "type": asset['type'],
-            "lat": asset['lat'],
-            "lon": asset['lon'],
-            "importance": asset['importance'],
-            "radius": asset['radius']
-        })
+        assets_list: List of dictionaries with keys: name, type, lat, lon, importance, radius (and id, if stored)
+    """
+    return ASSETS.publish(assets_list)
 
 # 3. OUTPUT SCHEMA
 class RiskAssessment(BaseModel):
@@ -101,61 +122,162 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return R * c
 
-def get_impacted_assets(event_lat, event_lon):
+def get_impacted_assets(event_lat, event_lon, registry=None, event_radius_km=0.0):
     """
     PROXIMITY TRIGGER LOGIC:
     Filters the Asset Registry to find any asset where:
-    Distance(Event, Asset) < Asset.radius
+    Distance(Event, Asset) < Asset.radius + event_radius_km
+    event_radius_km is how precisely the event is located (e.g. "in Chennai" is
+    anywhere in the city). registry is a RegistrySnapshot (default: the current
+    one); its spatial index only measures assets near the event, in one vectorized pass.
     """
     impacted = []
+    registry = ASSETS.current() if registry is None else registry
     
-    for asset in ASSET_REGISTRY:
-        distance = calculate_distance(event_lat, event_lon, asset['lat'], asset['lon'])
-        
-        # Logic: If the event is within the asset's "Concern Zone"
-        if distance <= asset['radius']:
-            asset_copy = asset.copy()
-            asset_copy['distance_from_event_km'] = round(distance, 2)
-            impacted.append(asset_copy)
+    # Logic: If the event is within the asset's "Concern Zone"
+    for asset, distance in registry.near(event_lat, event_lon, event_radius_km):
+        asset_copy = dict(asset)
+        asset_copy['distance_from_event_km'] = round(distance, 2)
+        impacted.append(asset_copy)
             
     # Sort by Importance Score (Highest first) so we protect critical assets first
     impacted.sort(key=lambda x: x['importance'], reverse=True)
     return impacted
 
 # 5. MAIN ASSESSMENT FUNCTION
-def assess_news_risk(article_input, weather_data=None):
-    """
-    1. Checks Proximity (Math).
-    2. Checks Context (LLM).
-    3. Merges them into a Risk Score.
-    """
-    
-    # A. Extract Coordinates of the SEARCH TARGET (The "Event" Center)
+# Raw LLM assessments (before the importance multiplier) are cached by their
+# inputs, so rescoring an unchanged article under unchanged weather is free.
+# The cache is LRU-capped and shared with the other process via cache.py;
+# hits/misses are exported as sentinel_cache_requests_total{cache="llm_assessments"}.
+ASSESSMENT_CACHE = PersistentCache(
+    "llm_assessments",
+    ttl=int(os.getenv("LLM_CACHE_TTL_HOURS", "24")) * 3600,
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000")),
+)
+
+def _cached_assessment(cache_key):
+    """A cached assessment that still validates as a RiskAssessment, else None."""
+    cached = ASSESSMENT_CACHE.get(cache_key)
+    if cached is None:
+        return None
+    try:
+        return RiskAssessment.model_validate(cached).model_dump()
+    except ValueError:
+        ASSESSMENT_CACHE.delete(cache_key)
+        return None
+
+@replayable("openai")
+async def _llm_assess(prompt):
+    """One structured LLM call -> RiskAssessment as a dict."""
+    assessment = await _async_client.get().chat.completions.create(
+        model="gpt-4o-mini",
+        response_model=RiskAssessment,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+    )
+    return assessment.model_dump()
+
+async def _limited_call(stage, call, limiter, timeout):
+    """Awaits call() under the concurrency limit, the rate limit and the timeout."""
+    async with limiter:
+        await asyncio.to_thread(acquire, "openai")
+        try:
+            with track(stage):
+                return await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            inc("sentinel_llm_timeouts_total")
+            raise TimeoutError(f"No LLM response within {timeout:g}s") from None
+
+def _event_place(article_input, weather_data):
+    """The place the article reports on (gazetteer.py), or None to keep the event at the search location."""
+    near = (weather_data['lat'], weather_data['lon']) if weather_data and weather_data.get('lat') is not None else None
+    return locate_event(article_input, near)
+
+def _nearby_assets(weather_data, registry=None, place=None):
+    """Assets in range of an event at place (from _event_place()), else at the weather location; most important first."""
+    # A. Extract Coordinates of the Event: the place the article names, else the SEARCH TARGET
     # Default to 0,0 if missing, but typically weather_data provides the search center
+    if place is not None:
+        return get_impacted_assets(place.lat, place.lon, registry, place.extent_km)
     event_lat = weather_data.get('lat', 0)
     event_lon = weather_data.get('lon', 0)
     
     # B. Run Proximity Trigger
-    nearby_assets = get_impacted_assets(event_lat, event_lon)
-    
+    return get_impacted_assets(event_lat, event_lon, registry)
+
+def _asset_context(target):
+    """(prompt description, importance multiplier) for an asset from get_impacted_assets()."""
+    asset_context = f"{target['name']} ({target['type']}) - {target['distance_from_event_km']}km away"
+    # Importance Multiplier: Critical assets boost the risk score
+    # Score 10 -> 1.5x risk, Score 5 -> 1.0x risk
+    importance_multiplier = 1.0 + (target['importance'] - 5) * 0.1
+    return asset_context, importance_multiplier
+
+def _primary_context(nearby_assets, asset=None):
+    """
+    (target asset or None, prompt description, importance multiplier): asset, if it
+    is in range, else the most important asset in range.
+    """
     # If NO assets are nearby, we still run analysis but flag it as "General"
     if not nearby_assets:
-        primary_asset_context = "General Supply Chain (No specific asset in range)"
-        importance_multiplier = 1.0
-    else:
-        # Take the most important asset found
-        target = nearby_assets[0]
-        primary_asset_context = f"{target['name']} ({target['type']}) - {target['distance_from_event_km']}km away"
-        # Importance Multiplier: Critical assets boost the risk score
-        # Score 10 -> 1.5x risk, Score 5 -> 1.0x risk
-        importance_multiplier = 1.0 + (target['importance'] - 5) * 0.1
-
-    # C. Construct Prompt
-    weather_context = "N/A"
+        return None, "General Supply Chain (No specific asset in range)", 1.0
+
+    # The asset the article was found for gets its own assessment; else take the most important asset found
+    own = asset_id(asset) if asset else None
+    target = next((a for a in nearby_assets if a['id'] == own), nearby_assets[0])
+    return (target, *_asset_context(target))
+
+def _target_context(weather_data, registry=None, place=None):
+    """(target asset or None, prompt description, importance multiplier) for an event at place, else the weather location."""
+    return _primary_context(_nearby_assets(weather_data, registry, place))
+
+def assessment_cache_key(article_input, target, weather_data):
+    """Hash of everything the LLM sees, normalized (case, whitespace) and with the weather bucketed."""
+    def norm(text):
+        return " ".join(str(text or "").lower().split())
+    payload = json.dumps([
+        norm(article_input.get('headline')),
+        norm(article_input.get('summary')),
+        target['name'] if target else None,
+        target['distance_from_event_km'] if target else None,
+        bucket_weather(weather_data),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _weather_context(weather_data):
     if weather_data:
-        weather_context = f"{weather_data.get('condition')}, Wind: {weather_data.get('wind_speed_ms')}m/s"
+        return f"{weather_data.get('condition')}, Wind: {weather_data.get('wind_speed_ms')}m/s"
+    return "N/A"
 
-    prompt = f"""
+def _apply_importance(result, importance_multiplier, primary_asset_context, target=None):
+    """E. Apply Importance Logic (The "Multiplier"), for target (None: the general context)"""
+    # If it's a real threat (>20) AND it's a critical asset, boost the score.
+    if result['risk_score'] > 20:
+        result['risk_score'] = int(result['risk_score'] * importance_multiplier)
+        # Cap at 100
+        result['risk_score'] = min(result['risk_score'], 100)
+        
+    result['impacted_asset'] = primary_asset_context
+    result['target_asset'] = _target_name(target)
+    return result
+
+def _target_name(target):
+    """Registry id (registry.asset_id()) of the asset a result is about (None for the general context)."""
+    return target['id'] if target else None
+
+def _error_result(e):
+    return {
+        "risk_score": 0,
+        "severity": "ERROR",
+        "reasoning": str(e),
+        "action": "Check Logs",
+        "impacted_asset": "System Error",
+        "target_asset": None,
+        "estimated_impact_radius": 0
+    }
+
+def _single_prompt(article_input, primary_asset_context, weather_context):
+    return f"""
     You are a Security Operations Center AI.
     
     TARGET ASSET: {primary_asset_context}
@@ -173,34 +295,555 @@ def assess_news_risk(article_input, weather_data=None):
     - Estimate the "Impact Radius" of the event (e.g., a massive explosion might impact 10km, a petty theft 0km).
     """
 
+def assess_news_risk(article_input, weather_data=None, registry=None):
+    """
+    1. Checks Proximity (Math), against registry (a RegistrySnapshot; default: the current one),
+       from the place the article names or else the weather location.
+    2. Checks Context (LLM).
+    3. Merges them into a Risk Score.
+    """
+    return assess_news_risk_batch([article_input], weather_data, registry)[0]
+
+# 6. BATCHED ASSESSMENT
+# Several articles for the same asset share one prompt (asset, weather, task) and
+# one LLM call that returns a list of RiskAssessment, one per article in order.
+# A batch whose reply fails validation is split in half and retried, down to
+# single-article calls; any other error is every article's ERROR result.
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "10"))
+
+@lru_cache(maxsize=None)
+def _batch_model(count, item="news alert", items="alerts"):
+    """Response model for exactly count assessments, one per item."""
+    return create_model(
+        f"RiskAssessmentBatch{count}" if item == "news alert" else f"AssetRiskAssessments{count}",
+        assessments=(conlist(RiskAssessment, min_length=count, max_length=count),
+                     Field(..., description=f"One assessment per {item}, in the order the {items} are listed.")),
+    )
+
+@replayable("openai")
+async def _llm_assess_batch(prompt, count):
+    """One structured LLM call -> count RiskAssessments as dicts."""
+    batch = await _async_client.get().chat.completions.create(
+        model="gpt-4o-mini",
+        response_model=_batch_model(count),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+    )
+    return [assessment.model_dump() for assessment in batch.assessments]
+
+def _batch_prompt(article_inputs, primary_asset_context, weather_context):
+    alerts = "\n    ".join(
+        f"{n}. Headline: {article.get('headline')}\n       Summary: {article.get('summary')}"
+        for n, article in enumerate(article_inputs, start=1)
+    )
+    return f"""
+    You are a Security Operations Center AI.
+    
+    TARGET ASSET: {primary_asset_context}
+    
+    LOCAL WEATHER: {weather_context}
+    
+    NEWS ALERTS:
+    {alerts}
+    
+    TASK:
+    For EACH news alert separately, assess if it poses a physical or operational threat to the TARGET ASSET.
+    Return exactly {len(article_inputs)} assessments, in the same order as the alerts.
+    - If the target is "General Supply Chain", be conservative.
+    - If the target is a specific warehouse, be highly sensitive to physical threats (fire, riot, flood).
+    - Estimate the "Impact Radius" of each event (e.g., a massive explosion might impact 10km, a petty theft 0km).
+    """
+
+def _invalid_reply(e):
+    """
+    True if e (as raised by an instructor call) means the model's reply didn't
+    validate, the only failure that splitting a request can help with. Auth,
+    rate-limit and connection errors would fail every half the same way.
+    """
+    while e is not None:
+        # A replay archive without the request recorded the run that split it
+        if isinstance(e, (ValidationError, json.JSONDecodeError, ReplayMiss)):
+            return True
+        last_attempt = getattr(e, "last_attempt", None)  # tenacity's RetryError
+        e = last_attempt.exception() if last_attempt is not None else (e.__cause__ or e.__context__)
+    return False
+
+async def _assess_uncached(article_inputs, weather_data, primary_asset_context, limiter, timeout):
+    """Raw assessments (or an exception per article) for articles not in the cache."""
+    weather_context = _weather_context(weather_data)
+    if len(article_inputs) == 1:
+        prompt = _single_prompt(article_inputs[0], primary_asset_context, weather_context)
+        try:
+            return [await _limited_call("openai_assess_news_risk", lambda: _llm_assess(prompt), limiter, timeout)]
+        except Exception as e:
+            return [e]
+
+    prompt = _batch_prompt(article_inputs, primary_asset_context, weather_context)
     try:
-        # D. Call LLM
-        assessment = client.chat.completions.create(
-            model="gpt-4o-mini",
-            response_model=RiskAssessment,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
+        return await _limited_call("openai_assess_news_risk_batch",
+                                   lambda: _llm_assess_batch(prompt, len(article_inputs)), limiter, timeout)
+    except Exception as e:
+        # A slow provider won't get faster for smaller requests, nor a failing one succeed
+        if isinstance(e, TimeoutError) or not _invalid_reply(e):
+            return [e] * len(article_inputs)
+        half = len(article_inputs) // 2
+        halves = await asyncio.gather(
+            _assess_uncached(article_inputs[:half], weather_data, primary_asset_context, limiter, timeout),
+            _assess_uncached(article_inputs[half:], weather_data, primary_asset_context, limiter, timeout),
         )
-        
-        result = assessment.model_dump()
-        
-        # E. Apply Importance Logic (The "Multiplier")
-        # If it's a real threat (>20) AND it's a critical asset, boost the score.
-        if result['risk_score'] > 20:
-            result['risk_score'] = int(result['risk_score'] * importance_multiplier)
-            # Cap at 100
-            result['risk_score'] = min(result['risk_score'], 100)
-            
-        result['impacted_asset'] = primary_asset_context
-        
-        return result
+        return halves[0] + halves[1]
+
+def _by_place(article_inputs, weather_data):
+    """{event place (or None): indices of the articles reporting on it}, in order of first mention."""
+    groups = {}
+    for i, article_input in enumerate(article_inputs):
+        groups.setdefault(_event_place(article_input, weather_data), []).append(i)
+    return groups
+
+def assess_news_risk_batch(article_inputs, weather_data=None, registry=None):
+    """
+    assess_news_risk() for several articles found for the same asset, in as few
+    LLM calls as possible. Returns one result per article, in order. Articles
+    are batched per event location: those naming the same place share a target.
+    """
+    articles = [{"Headline": a.get('headline'), "summary": a.get('summary')} for a in article_inputs]
+    return assess_stories_parallel([(articles, weather_data)], registry=registry)[0]
+
+# 7. MULTI-ASSET ASSESSMENT
+# When an event is in range of several assets, one LLM call assesses the article
+# for each of them (up to LLM_MULTI_ASSET_MAX, most important first) instead of
+# the article being scored again for every asset that sees it. The model only
+# judges the threat; each asset's importance multiplier is applied here.
+# A call whose reply fails validation is split over the assets, down to single-asset calls.
+LLM_MULTI_ASSET_MAX = int(os.getenv("LLM_MULTI_ASSET_MAX", "5"))
+
+@replayable("openai")
+async def _llm_assess_multi(prompt, count):
+    """One structured LLM call -> count RiskAssessments (one per target asset) as dicts."""
+    batch = await _async_client.get().chat.completions.create(
+        model="gpt-4o-mini",
+        response_model=_batch_model(count, "target asset", "assets"),
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.1,
+    )
+    return [assessment.model_dump() for assessment in batch.assessments]
+
+def _multi_asset_prompt(article_input, asset_contexts, weather_context):
+    targets = "\n    ".join(f"{n}. {context}" for n, context in enumerate(asset_contexts, start=1))
+    return f"""
+    You are a Security Operations Center AI.
+    
+    TARGET ASSETS:
+    {targets}
+    
+    LOCAL WEATHER: {weather_context}
+    
+    NEWS ALERT:
+    Headline: {article_input.get('headline')}
+    Summary: {article_input.get('summary')}
+    
+    TASK:
+    For EACH target asset separately, assess if this news poses a physical or operational threat to it.
+    Return exactly {len(asset_contexts)} assessments, in the same order as the assets.
+    - Be highly sensitive to physical threats (fire, riot, flood) close to an asset; distance matters.
+    - Estimate the "Impact Radius" of the event (e.g., a massive explosion might impact 10km, a petty theft 0km).
+    """
+
+async def _assess_multi_uncached(article_input, weather_data, asset_contexts, limiter, timeout):
+    """Raw assessments (or an exception) of one article for each asset context."""
+    if len(asset_contexts) == 1:
+        return await _assess_uncached([article_input], weather_data, asset_contexts[0], limiter, timeout)
 
+    prompt = _multi_asset_prompt(article_input, asset_contexts, _weather_context(weather_data))
+    try:
+        return await _limited_call("openai_assess_news_risk_multi",
+                                   lambda: _llm_assess_multi(prompt, len(asset_contexts)), limiter, timeout)
     except Exception as e:
-        return {
-            "risk_score": 0,
-            "severity": "ERROR",
-            "reasoning": str(e),
-            "action": "Check Logs",
-            "impacted_asset": "System Error",
-            "estimated_impact_radius": 0
-        }
+        if isinstance(e, TimeoutError) or not _invalid_reply(e):
+            return [e] * len(asset_contexts)
+        half = len(asset_contexts) // 2
+        halves = await asyncio.gather(
+            _assess_multi_uncached(article_input, weather_data, asset_contexts[:half], limiter, timeout),
+            _assess_multi_uncached(article_input, weather_data, asset_contexts[half:], limiter, timeout),
+        )
+        return halves[0] + halves[1]
+
+async def _assess_for_targets(article_input, weather_data, targets, limiter, timeout):
+    """
+    One article's result for each target asset (importance applied, or ERROR):
+    cached assessments are reused, the rest come from one multi-asset call.
+    """
+    contexts = [_asset_context(target) for target in targets]
+    cache_keys = [assessment_cache_key(article_input, target, weather_data) for target in targets]
+    raws = [_cached_assessment(cache_key) for cache_key in cache_keys]
+    missing = [n for n, raw in enumerate(raws) if raw is None]
+    if missing:
+        fresh = await _assess_multi_uncached(article_input, weather_data, [contexts[n][0] for n in missing],
+                                             limiter, timeout)
+        for n, raw in zip(missing, fresh):
+            raws[n] = raw
+            if not isinstance(raw, Exception):
+                ASSESSMENT_CACHE.set(cache_keys[n], raw)
+    return [_error_result(raw) if isinstance(raw, Exception) else _apply_importance(dict(raw), multiplier, context, target)
+            for raw, (context, multiplier), target in zip(raws, contexts, targets)]
+
+def _multi_targets(nearby_assets):
+    """The assets a multi-asset call covers (none: use the single-target path)."""
+    if LLM_MULTI_ASSET_MAX < 2 or len(nearby_assets) < 2:
+        return []
+    return nearby_assets[:LLM_MULTI_ASSET_MAX]
+
+def assess_news_risk_multi(article_input, weather_data=None, registry=None):
+    """
+    assess_news_risk() for every asset in range of the event, from one LLM call.
+    Returns [(asset, result)], most important asset first; result['impacted_asset']
+    names the asset and the asset's own importance multiplier is applied.
+    """
+    registry = ASSETS.current() if registry is None else registry
+    place = _event_place(article_input, weather_data)
+    targets = _multi_targets(_nearby_assets(weather_data, registry, place))
+    if not targets:
+        target, _, _ = _target_context(weather_data, registry, place)
+        return [(target, assess_news_risk(article_input, weather_data, registry))]
+
+    provisional = screen(article_input)
+    if provisional is not None:
+        return [(target, _apply_importance(dict(provisional), multiplier, context, target))
+                for target, (context, multiplier) in zip(targets, map(_asset_context, targets))]
+    limiter = asyncio.Semaphore(LLM_CONCURRENCY)
+    results = _run_scoring(lambda client, _: _with_client(client, lambda: _assess_for_targets(
+        article_input, weather_data, targets, limiter, LLM_TIMEOUT_SECONDS)))
+    return list(zip(targets, results))
+
+def _plan_multi_asset(unscored, parts, nearby, contexts):
+    """
+    Splits the articles that need the LLM into per-part batches and multi-asset calls.
+    Copies of a story seen in the same conditions but for different primary assets
+    are covered by one multi-asset call on the copy that has the most of those
+    assets in range; the covered copies follow that call's results.
+    Returns (pending: per part [(index, cache key)] to batch against its primary asset,
+    multi: [(part, index, target assets)], covered: [(part, index, story key)]).
+    """
+    pending = [[] for _ in parts]
+    multi, covered = [], []
+    groups = {}
+    for entry in unscored:
+        r, i, key, _ = entry
+        articles, weather_data, _, _ = parts[r]
+        story = (articles[i]['story_id'], bucket_weather(weather_data)) if key and contexts[r][0] else id(entry)
+        groups.setdefault(story, []).append(entry)
+
+    for group in groups.values():
+        while group:
+            best, hits = _best_multi_copy(group, nearby, contexts)
+            r, i, _, cache_key = best
+            if hits:
+                in_range = {a['id']: a for a in nearby[r]}
+                multi.append((r, i, [contexts[r][0]] + [in_range[contexts[o[0]][0]['id']] for o in hits]))
+                covered.extend((o[0], o[1], o[2]) for o in hits)
+            else:
+                pending[r].append((i, cache_key))
+            group = [entry for entry in group if entry is not best and entry not in hits]
+    return pending, multi, covered
+
+def _best_multi_copy(group, nearby, contexts):
+    """
+    (copy, other copies it covers): the copy of a story whose multi-asset targets
+    include the most other copies' primary assets (at most LLM_MULTI_ASSET_MAX - 1).
+    """
+    best, hits = group[0], []
+    for entry in group:
+        ids = {a['id'] for a in _multi_targets(nearby[entry[0]])}
+        covered = [other for other in group if other is not entry and contexts[other[0]][0]['id'] in ids]
+        if len(covered) > len(hits):
+            best, hits = entry, covered[:LLM_MULTI_ASSET_MAX - 1]
+    return best, hits
+
+# 8. STORY-LEVEL SCORING (deduplicated)
+# Articles carry a story_id from dedup.py. A story is scored once per assessment
+# context (target asset + weather bucket) and the result is fanned out to every asset
+# and scan in the dedup window that sees the same story in the same context.
+# Runs in other threads or sessions that meet a story while it is being scored
+# wait for that result: the first run claims the story key, the others await its
+# future. Nothing is locked while the LLM is called.
+STORY_SCORES = PersistentCache("story_scores", ttl=int(DEDUP_WINDOW_HOURS * 3600), max_entries=100000)
+_inflight = {}  # story key -> Future of its result, while a run scores it
+_inflight_lock = threading.Lock()
+
+def _story_key(article, target, weather_data):
+    # Same weather bucket = same conditions, as for the monitor's per-asset reuse
+    return f"{article['story_id']}|{target['id'] if target else '-'}|{bucket_weather(weather_data)}"
+
+def _ai_input(article):
+    return {"headline": article["Headline"], "summary": article.get("summary", article["Headline"])}
+
+def _claim(key):
+    """None if the calling run now scores the story key, else the Future of the run that does."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            _inflight[key] = concurrent.futures.Future()
+        return future
+
+def _release(key, result):
+    """Ends a claim: result (None if the story wasn't scored) goes to the runs waiting for it."""
+    with _inflight_lock:
+        future = _inflight.pop(key)
+    future.set_result(result)
+
+def assess_story(article, weather_data=None, registry=None, asset=None):
+    """assess_news_risk() for a parsed, dedup-tagged article, shared across copies of its story."""
+    return assess_stories([article], weather_data, registry, asset)[0]
+
+def assess_stories(articles, weather_data=None, registry=None, asset=None):
+    """Batched assess_story() for the articles found for asset; see assess_stories_async()."""
+    return assess_stories_parallel([(articles, weather_data, asset)], registry=registry)[0]
+
+def _split_by_place(requests):
+    """
+    Each (articles, weather_data[, asset]) request as one part per event location. Returns
+    ([(articles, weather_data, place, asset or None)], the (request, article indices) of each part).
+    """
+    parts, origins = [], []
+    for r, request in enumerate(requests):
+        articles, weather_data = request[:2]
+        asset = request[2] if len(request) > 2 else None
+        for place, indices in _by_place([_ai_input(art) for art in articles], weather_data).items():
+            parts.append(([articles[i] for i in indices], weather_data, place, asset))
+            origins.append((r, indices))
+    return parts, origins
+
+def _triage(parts, contexts, results):
+    """
+    Fills in the results that need no LLM call (story already scored, screened out,
+    cached) and sorts the other articles. Returns (owners: {story key: (part, index)}
+    claimed by this run, followers: [(part, index, story key)] copies of those,
+    waiting: [(part, index, Future)] stories another run is scoring,
+    unscored: [(part, index, story key or None, cache key)] for the LLM).
+    If it fails, its claims are released before the error propagates.
+    """
+    owners, followers, waiting, unscored = {}, [], [], []
+    try:
+        for r, (articles, weather_data, _, _) in enumerate(parts):
+            target, primary_asset_context, importance_multiplier = contexts[r]
+            for i, art in enumerate(articles):
+                key = _story_key(art, target, weather_data) if art.get("story_id") else None
+                if key in owners:
+                    followers.append((r, i, key))
+                    continue
+                shared = STORY_SCORES.get(key) if key else None
+                if shared is not None:
+                    inc("sentinel_story_fanout_total")
+                    results[r][i] = {**shared, "impacted_asset": primary_asset_context,
+                                     "target_asset": _target_name(target)}
+                    continue
+                if key:
+                    future = _claim(key)
+                    if future is not None:
+                        waiting.append((r, i, future))
+                        continue
+                    owners[key] = (r, i)
+
+                provisional = screen(_ai_input(art))
+                if provisional is not None:
+                    results[r][i] = _apply_importance(provisional, importance_multiplier, primary_asset_context, target)
+                    continue
+                cache_key = assessment_cache_key(_ai_input(art), target, weather_data)
+                cached = _cached_assessment(cache_key)
+                if cached is not None:
+                    results[r][i] = _apply_importance(cached, importance_multiplier, primary_asset_context, target)
+                else:
+                    unscored.append((r, i, key, cache_key))
+    except BaseException:
+        for key in owners:
+            _release(key, None)
+        raise
+    return owners, followers, waiting, unscored
+
+# 9. CONCURRENT SCORING (async)
+# Scores many assets' articles together: every LLM call the set needs is issued
+# on one event loop through an AsyncOpenAI client, with at most LLM_CONCURRENCY
+# calls in flight and each one cut off after LLM_TIMEOUT_SECONDS. Timed-out
+# articles come back as ERROR results (not cached, so the next scan retries them).
+# Every entry point above runs through here. Blocking callers all share one
+# long-lived loop thread and client, built on first use and closed at exit:
+# the monitor's pipeline starts new worker threads every scan, and building a
+# client loads the CA bundle, ~0.2s of CPU that would stall every other thread.
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+_scoring = None  # (event loop, its thread, async client), once started
+_scoring_lock = threading.Lock()
+
+async def _with_client(client, make_call):
+    """Awaits make_call() with client as the async client (a new one, closed after, if None)."""
+    own = client is None
+    token = _async_client.set(_new_async_client() if own else client)
+    try:
+        return await make_call()
+    finally:
+        if own:
+            await _async_client.get().close()
+        _async_client.reset(token)
+
+async def _score_batch(articles, weather_data, context, chunk, limiter, timeout):
+    """[(index, result)] for one batch [(index, cache key)] of a part's articles, caching fresh assessments."""
+    target, primary_asset_context, importance_multiplier = context
+    raws = await _assess_uncached([_ai_input(articles[i]) for i, _ in chunk], weather_data, primary_asset_context,
+                                  limiter, timeout)
+    scored = []
+    for (i, cache_key), raw in zip(chunk, raws):
+        if isinstance(raw, Exception):
+            scored.append((i, _error_result(raw)))
+        else:
+            ASSESSMENT_CACHE.set(cache_key, raw)
+            scored.append((i, _apply_importance(dict(raw), importance_multiplier, primary_asset_context, target)))
+    return scored
+
+async def assess_stories_async(requests, concurrency=None, timeout=None, on_progress=None, client=None,
+                               registry=None):
+    """
+    assess_stories() for many (articles, weather_data[, asset]) requests at once, with
+    all LLM calls running concurrently. Returns one result list per request, in order.
+    A request's articles are assessed for its asset when the event is in that asset's
+    range, else for the most important asset in range. A story seen by several
+    requests is scored once and fanned out to the others; copies of it found for
+    different assets in range are assessed for all of them in one call (section 7).
+    Articles naming another place are scored for the assets around that place
+    (gazetteer.py); result['target_asset'] is the registry id of the asset a result
+    is about (None: no asset in range), which need not be the request's asset.
+    on_progress(done, total) is called as each LLM call finishes. Without a client
+    (an instructor-patched AsyncOpenAI) one is created for this call and closed after.
+    """
+    limiter = asyncio.Semaphore(concurrency or LLM_CONCURRENCY)
+    timeout = timeout or LLM_TIMEOUT_SECONDS
+    registry = ASSETS.current() if registry is None else registry
+    parts, origins = _split_by_place(requests)
+    nearby = [_nearby_assets(weather_data, registry, place) for _, weather_data, place, _ in parts]
+    contexts = [_primary_context(assets, asset) for assets, (_, _, _, asset) in zip(nearby, parts)]
+    results = [[None] * len(articles) for articles, _, _, _ in parts]
+
+    owners, followers, waiting, unscored = _triage(parts, contexts, results)
+    scored_here = {}  # story key -> result, for the stories this run scored
+    try:
+        pending, multi, covered = _plan_multi_asset(unscored, parts, nearby, contexts)
+        followers += covered
+        chunks = [(r, pending[r][start:start + LLM_BATCH_SIZE])
+                  for r in range(len(parts)) for start in range(0, len(pending[r]), LLM_BATCH_SIZE)]
+        done = 0
+
+        def finished_call():
+            nonlocal done
+            done += 1
+            if on_progress:
+                on_progress(done, len(chunks) + len(multi))
+
+        async def score_chunk(r, chunk):
+            articles, weather_data, _, _ = parts[r]
+            for i, result in await _score_batch(articles, weather_data, contexts[r], chunk, limiter, timeout):
+                results[r][i] = result
+            finished_call()
+
+        async def score_multi(r, i, targets):
+            articles, weather_data, _, _ = parts[r]
+            scored = await _assess_for_targets(_ai_input(articles[i]), weather_data, targets, limiter, timeout)
+            results[r][i] = scored[0]
+            for target, result in zip(targets[1:], scored[1:]):
+                scored_here[_story_key(articles[i], target, weather_data)] = result
+            finished_call()
+
+        if chunks or multi:
+            await _with_client(client, lambda: asyncio.gather(*(score_chunk(r, chunk) for r, chunk in chunks),
+                                                              *(score_multi(*entry) for entry in multi)))
+
+        for key, (r, i) in owners.items():
+            if results[r][i] is not None:
+                scored_here[key] = results[r][i]
+        for r, i, key in followers:
+            inc("sentinel_story_fanout_total")
+            results[r][i] = {**scored_here[key], "impacted_asset": contexts[r][1],
+                              "target_asset": _target_name(contexts[r][0])}
+        for key, result in scored_here.items():
+            if result['severity'] != "ERROR":
+                STORY_SCORES.set(key, result)
+    finally:
+        # Before waiting on other runs, so two runs never wait on each other
+        for key in owners:
+            _release(key, scored_here.get(key))
+
+    await _follow_other_runs(waiting, parts, contexts, results, concurrency, timeout, client, registry)
+    merged = [[None] * len(request[0]) for request in requests]
+    for (r, indices), part_results in zip(origins, results):
+        for i, result in zip(indices, part_results):
+            merged[r][i] = result
+    return merged
+
+async def _follow_other_runs(waiting, parts, contexts, results, concurrency, timeout, client, registry):
+    """
+    Results for the stories other runs were scoring; ones they couldn't score are
+    scored here. A story still unscored after timeout seconds is an ERROR result.
+    """
+    futures = [asyncio.wrap_future(future) for _, _, future in waiting]
+    if futures:
+        # asyncio.wait() doesn't cancel what is left, so the other run can still publish it
+        await asyncio.wait(futures, timeout=timeout)
+    retry = {}  # part -> indices
+    for (r, i, _), future in zip(waiting, futures):
+        shared = future.result() if future.done() else None
+        if not future.done():
+            results[r][i] = _error_result(TimeoutError(f"Another run was still scoring this story after {timeout:g}s"))
+        elif shared is None or shared['severity'] == "ERROR":
+            retry.setdefault(r, []).append(i)
+        else:
+            inc("sentinel_story_fanout_total")
+            results[r][i] = {**shared, "impacted_asset": contexts[r][1], "target_asset": _target_name(contexts[r][0])}
+    if retry:
+        again = await assess_stories_async([([parts[r][0][i] for i in indices], parts[r][1], parts[r][3])
+                                            for r, indices in retry.items()],
+                                           concurrency, timeout, client=client, registry=registry)
+        for (r, indices), scored in zip(retry.items(), again):
+            for i, result in zip(indices, scored):
+                results[r][i] = result
+
+def _scoring_loop():
+    """(event loop, async client) that blocking callers score on, started on first use."""
+    global _scoring
+    with _scoring_lock:
+        if _scoring is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="sentinel-scoring", daemon=True)
+            thread.start()
+            _scoring = (loop, thread, _new_async_client())
+            atexit.register(_stop_scoring)
+        loop, _, client = _scoring
+        return loop, client
+
+def _stop_scoring():
+    """Closes the scoring client and loop (at exit)."""
+    loop, thread, client = _scoring
+    asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+def _run_scoring(make_coroutine, on_progress=None):
+    """
+    Runs make_coroutine(client, report) on the scoring loop and returns its result.
+    Each report(done, total) reaches on_progress on the calling thread, which is the
+    only thread that may update its progress bar (Streamlit).
+    """
+    loop, client = _scoring_loop()
+    updates = queue.SimpleQueue()
+    future = asyncio.run_coroutine_threadsafe(make_coroutine(client, lambda *update: updates.put(update)), loop)
+    future.add_done_callback(lambda _: updates.put(None))
+    for update in iter(updates.get, None):
+        if on_progress:
+            on_progress(*update)
+    return future.result()
+
+def assess_stories_parallel(requests, concurrency=None, timeout=None, on_progress=None, registry=None):
+    """Blocking assess_stories_async(), for threaded code."""
+    registry = ASSETS.current() if registry is None else registry
+    return _run_scoring(lambda client, report: assess_stories_async(requests, concurrency, timeout, report,
+                                                                    client=client, registry=registry),
+                        on_progress)
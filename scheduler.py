@@ -0,0 +1,124 @@
+import os
+import heapq
+import random
+import time
+
+# --- ADAPTIVE SCAN SCHEDULER ---
+# Every asset gets its own next-scan time instead of one global hourly sweep.
+# Critical, risky or stormy assets are rescanned often; low-importance calm ones
+# rarely. Due times sit in a heap, and jitter keeps assets from lining up, so
+# API usage stays level instead of bursting on the hour.
+
+MIN_INTERVAL_MINUTES = float(os.getenv("SCAN_MIN_INTERVAL_MINUTES", "10"))
+MAX_INTERVAL_MINUTES = float(os.getenv("SCAN_MAX_INTERVAL_MINUTES", "240"))
+SCHEDULE_JITTER = 0.1  # +/- 10% on every interval
+
+def asset_key(asset):
+    return str(asset.get('id') or asset['name'])
+
+def weather_change(previous, current):
+    """0..1 score of how much the weather moved between two parse_weather_risk() results."""
+    if not previous or not current or "error" in previous or "error" in current:
+        return 0.0
+    change = (abs(current.get("temp_c", 0) - previous.get("temp_c", 0)) / 10
+              + abs(current.get("wind_speed_ms", 0) - previous.get("wind_speed_ms", 0)) / 10
+              + abs(current.get("visibility_km", 10) - previous.get("visibility_km", 10)) / 10)
+    if current.get("condition") != previous.get("condition"):
+        change += 0.5
+    return min(change, 1.0)
+
+def scan_interval(importance, last_risk, volatility,
+                  min_minutes=MIN_INTERVAL_MINUTES, max_minutes=MAX_INTERVAL_MINUTES):
+    """
+    Seconds until the next scan. Starts at the max interval and shrinks with:
+    importance (10 -> x0.25), last max_risk_score (100 -> x0.1) and weather volatility (1.0 -> x0.5).
+    """
+    importance = min(max(importance or 5, 1), 10)
+    importance_factor = 1 - (importance - 1) / 9 * 0.75
+    risk_factor = 1 - 0.9 * min(max(last_risk or 0, 0), 100) / 100
+    volatility_factor = 1 - 0.5 * volatility
+    minutes = max_minutes * importance_factor * risk_factor * volatility_factor
+    return max(min_minutes, min(max_minutes, minutes)) * 60
+
+class ScanScheduler:
+    def __init__(self, min_minutes=MIN_INTERVAL_MINUTES, max_minutes=MAX_INTERVAL_MINUTES):
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self._heap = []        # (due_at, seq, key)
+        self._seq = 0
+        self._assets = {}      # key -> latest asset dict
+        self._due_at = {}      # key -> current due time (older heap entries are stale)
+        self._weather = {}     # key -> last weather seen
+        self._volatility = {}  # key -> smoothed weather change
+
+    def _push(self, key, due_at):
+        self._seq += 1
+        self._due_at[key] = due_at
+        heapq.heappush(self._heap, (due_at, self._seq, key))
+
+    def sync(self, assets):
+        """
+        Adds new assets and forgets removed ones. New assets get a first scan spread
+        randomly over the minimum interval, so a restart doesn't scan everything at once.
+        """
+        now = time.time()
+        current = {asset_key(a): a for a in assets}
+        for key in list(self._assets):
+            if key not in current:
+                del self._assets[key]
+                self._due_at.pop(key, None)
+                self._weather.pop(key, None)
+                self._volatility.pop(key, None)
+        for key, asset in current.items():
+            if key not in self._assets:
+                self._push(key, now + random.uniform(0, self.min_minutes * 60))
+            self._assets[key] = asset
+
+    def pop_due(self, now=None):
+        """Removes and returns every asset whose scan is due."""
+        now = now or time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, key = heapq.heappop(self._heap)
+            if self._due_at.get(key) != due_at:
+                continue  # Rescheduled or removed since this entry was pushed
+            del self._due_at[key]
+            due.append(self._assets[key])
+        return due
+
+    def record(self, asset, max_risk, weather):
+        """Schedules the asset's next scan from the result of the one that just finished."""
+        key = asset_key(asset)
+        if key not in self._assets:
+            return
+        change = weather_change(self._weather.get(key), weather)
+        volatility = 0.5 * self._volatility.get(key, 0.0) + 0.5 * change
+        self._volatility[key] = volatility
+        if weather and "error" not in weather:
+            self._weather[key] = weather
+
+        interval = scan_interval(asset.get('importance'), max_risk, volatility,
+                                 self.min_minutes, self.max_minutes)
+        interval *= random.uniform(1 - SCHEDULE_JITTER, 1 + SCHEDULE_JITTER)
+        self._push(key, time.time() + interval)
+        return interval
+
+    def retry_soon(self, asset):
+        """Failed scans come back after the minimum interval."""
+        key = asset_key(asset)
+        if key in self._assets:
+            self._push(key, time.time() + self.min_minutes * 60)
+
+    def defer(self, asset):
+        """Assets dropped by a scan's time budget are due again right away."""
+        key = asset_key(asset)
+        if key in self._assets:
+            self._push(key, time.time())
+
+    def next_due_in(self):
+        if not self._heap:
+            return None
+        return max(0, self._heap[0][0] - time.time())
+
+    def __len__(self):
+        return len(self._assets)